@@ -0,0 +1,54 @@
+"""
+Startup of a generated 10k-line prelude: parsing its source against loading its
+compiled file, then with the evaluation of its definitions, which reads the lists
+of the compiled file it needs. Run from the repository root:
+
+  python -m benchmarks.bench_bytecode
+"""
+from plisp import bytecode
+from plisp.ast import parse
+from plisp.evaluate import Context, AtomicSignal
+from benchmarks.bench_parse import generate_program
+import os
+import tempfile
+import time
+
+LINES = 10000
+REPEAT = 5
+
+
+def best(func) -> float:
+  times = []
+  for _ in range(REPEAT):
+    begin = time.perf_counter()
+    func()
+    times.append(time.perf_counter() - begin)
+  return min(times)
+
+
+def main():
+  with tempfile.TemporaryDirectory() as directory:
+    source = os.path.join(directory, "prelude.lisp")
+    with open(source, "w") as f:
+      f.write(generate_program(LINES))
+    bytecode.compile_file(source)
+    compiled = bytecode.compiled_path(source)
+
+    def parse_source():
+      with open(source) as f:
+        return parse(f)
+
+    def evaluate(node_list):
+      Context("", AtomicSignal(), append_namespace=True).evaluate_list(node_list)
+
+    parsed = best(parse_source)
+    loaded = best(lambda: bytecode.load(compiled, source))
+    print("%d lines, %.1f KB source, %.1f KB compiled" % (LINES, os.path.getsize(source) / 2**10, os.path.getsize(compiled) / 2**10))
+    print("parse %.3fs, load %.3fs (%.1fx)" % (parsed, loaded, parsed / loaded))
+    parsed = best(lambda: evaluate(parse_source()))
+    loaded = best(lambda: evaluate(bytecode.load(compiled, source)))
+    print("parse and evaluate %.3fs, load and evaluate %.3fs (%.1fx)" % (parsed, loaded, parsed / loaded))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,64 @@
+"""
+Evaluation benchmarks. Run from the repository root:
+
+  python -m benchmarks.bench_evaluate
+"""
+from plisp.ast import parse
+from plisp.evaluate import Context, AtomicSignal
+from io import StringIO
+import contextlib
+import time
+
+PRELUDE = """
+(define (fact n sum)
+  (if (= n 0) sum
+    (fact (- n 1) (* n sum))))
+
+(define (recurse n)
+  (if (= n 0) 1
+    (* n (recurse (- n 1)))))
+
+(define (arith n s)
+  (if (< n 1) s
+    (arith (- n 1) (+ s (* (+ n 1) (- n 2)) (/ (* n 3) (+ n 4)) (- (* n n) (* 2 n))))))
+
+(define (count n) (if (< n 1) n (count (- n 1))))
+
+(define g 1)
+(define (make n) (lambda (x) (+ %s)))
+(define (closures n f) (if (< n 1) f (closures (- n 1) (make n))))
+""" % " ".join(["g"] * 1000)
+
+# Name, code, repeat, and whether numbers are exact. Most cases use floats, so that
+# they stay comparable across versions: exact, `fact` computes a huge integer.
+CASES = [
+  ("fact (tail recursive)", "(fact 20000 1)", 1, False),
+  ("recurse (non-tail)", "(recurse 100)", 50, False),
+  ("arithmetic loop", "(arith 20000 0)", 1, False),
+  ("count (floats)", "(count 100000)", 1, False),
+  ("count (ints)", "(count 100000)", 1, True),
+  ("closures (1000 refs)", "(closures 20000 0)", 1, False),
+]
+
+
+def run(code : str, repeat : int, stackless=False, exact=False):
+  context = Context(PRELUDE + code, AtomicSignal(), append_namespace=True, exact=exact)
+  context.evaluate_list(parse(StringIO(PRELUDE), exact))
+  node_list = parse(StringIO(code), exact)
+  begin = time.perf_counter()
+  for _ in range(repeat):
+    context.evaluate_list(node_list, stackless)
+  return time.perf_counter() - begin
+
+
+def main():
+  print("%-24s %9s %9s" % ("", "closures", "stackless"))
+  for name, code, repeat, exact in CASES:
+    with contextlib.redirect_stdout(StringIO()):
+      elapsed = run(code, repeat, exact=exact)
+      stackless_elapsed = run(code, repeat, stackless=True, exact=exact)
+    print("%-24s %8.3fs %8.3fs" % (name, elapsed, stackless_elapsed))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,73 @@
+"""
+Effect of constant folding on programs of the test suite. Run from the repository
+root:
+
+  python -m benchmarks.bench_fold
+"""
+from plisp.ast import parse
+from plisp.evaluate import Context, AtomicSignal
+from plisp.optimize import fold_constants
+from io import StringIO
+import contextlib
+import time
+
+ACC = """
+(define (acc a b step func)
+  (define (acc-iter n sum)
+    (if (> n b) sum
+      (acc-iter (+ n step) (+ sum (func n)))))
+  (acc-iter a 0))
+"""
+
+CASES = [
+  ("PI (test_evaluate)", ACC + """
+(define (PI n)
+  (define (term n) (/ 1 (* n (+ n 2))))
+  (* 8 (acc 1 n 4 term)))
+(PI 20000)
+""", 5),
+  ("PI2 (test_evaluate)", ACC + """
+(define (PI2 n)
+  (define (term n)
+    (* (expt -1 n) (/ 1 (* (expt 3 n) (+ 1 (* 2 n))))))
+  (* 3.46410161514 (acc 0 n 1 term)))
+(PI2 100)
+""", 200),
+  ("constants in a loop", """
+(define (loop n sum)
+  (if (< n 1) sum
+    (loop (- n 1) (+ sum (* 60 60 24) (/ 1 (* 4 (+ 2 3)))))))
+(loop 20000 0)
+""", 5),
+  ("dead branches", """
+(define (loop n)
+  (if (< n 1) n
+    (if (> 1 2) (strcat "a" "b") (loop (- n (- 2 1))))))
+(loop 20000)
+""", 5),
+]
+
+
+def run(code : str, repeat : int, optimize : bool):
+  elapsed = 0
+  for _ in range(repeat):
+    node_list = parse(StringIO(code))
+    begin = time.perf_counter()
+    if optimize:
+      node_list = fold_constants(node_list)
+    Context(code, AtomicSignal(), append_namespace=True).evaluate_list(node_list)
+    elapsed += time.perf_counter() - begin
+  return elapsed
+
+
+def main():
+  print("%-24s %9s %9s" % ("", "plain", "folded"))
+  for name, code, repeat in CASES:
+    with contextlib.redirect_stdout(StringIO()):
+      elapsed = min(run(code, repeat, False) for _ in range(3))
+      folded_elapsed = min(run(code, repeat, True) for _ in range(3))
+    print("%-24s %8.3fs %8.3fs" % (name, elapsed, folded_elapsed))
+
+
+if __name__ == '__main__':
+  main()
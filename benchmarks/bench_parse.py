@@ -0,0 +1,85 @@
+"""
+Parser benchmarks on generated data files, the loading of a dumped program, and
+the memory taken by the parsed trees of a data file and of a program, with and
+without an arena. Run from the repository root:
+
+  python -m benchmarks.bench_parse
+"""
+from plisp.ast import parse, dumps, loads, ListNode
+from io import StringIO
+import time
+import tracemalloc
+
+SIZES = [1, 4, 8]  # In megabytes.
+
+
+def generate(size : int) -> str:
+  """
+  Generates about `size` bytes of `cons` cells holding numbers, symbols and long
+  string literals.
+  """
+  lines = []
+  total = 0
+  i = 0
+  while total < size:
+    line = '(define data-%d (cons %d.5 (cons "%s" (cons \'item\\n%d\' null))))\n' % (i, i, "x" * (i % 512), i)
+    lines.append(line)
+    total += len(line)
+    i += 1
+  return ''.join(lines)
+
+
+def generate_program(functions : int) -> str:
+  """
+  Generates `functions` small function definitions.
+  """
+  return "".join('(define (f-%d x y) (if (< x %d) (+ x (* y 2.5)) (f-%d (- x 1) (strcat "s" y))))\n' % (i, i, i)
+                 for i in range(functions))
+
+
+def count_nodes(nodes) -> int:
+  count = 0
+  stack = list(nodes)
+  while stack:
+    node = stack.pop()
+    count += 1
+    if isinstance(node, ListNode):
+      stack.extend(node.container)
+  return count
+
+
+def measure(name : str, text : str, arena=False):
+  # Parsed, at the peak of the parse, and once every node has been read back.
+  tracemalloc.start()
+  nodes = parse(StringIO(text), arena=arena)
+  size, peak = tracemalloc.get_traced_memory()
+  count = count_nodes(nodes)
+  read = tracemalloc.get_traced_memory()[0]
+  tracemalloc.stop()
+  print("%-14s %8d nodes %8.2f MB %8.1f bytes/node, peak %6.1f, read %6.1f" % (name, count, size / 2**20, size / count, peak / count, read / count))
+
+
+def main():
+  for megabytes in SIZES:
+    text = generate(megabytes * 2**20)
+    begin = time.perf_counter()
+    nodes = parse(StringIO(text))
+    elapsed = time.perf_counter() - begin
+    print("%3d MB, %7d forms %8.3fs %8.2f MB/s" % (megabytes, len(nodes), elapsed, len(text) / 2**20 / elapsed))
+  text = generate_program(20000)
+  begin = time.perf_counter()
+  nodes = parse(StringIO(text))
+  parsed = time.perf_counter() - begin
+  data = dumps(nodes)
+  begin = time.perf_counter()
+  loads(data)
+  loaded = time.perf_counter() - begin
+  print("program: parse %.3fs, loads of its dump %.3fs (%.1fx)" % (parsed, loaded, parsed / loaded))
+  measure("data", generate(4 * 2**20))
+  measure("program", generate_program(20000))
+  measure("data, arena", generate(4 * 2**20), arena=True)
+  measure("program, arena", generate_program(20000), arena=True)
+
+
+if __name__ == '__main__':
+  main()
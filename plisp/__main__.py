@@ -0,0 +1,37 @@
+"""
+Command line of plisp:
+
+  python -m plisp compile [--float] [-o OUTPUT] FILE...
+
+compiles every FILE to a `.plc` file next to it, or to OUTPUT, which
+`plisp.bytecode.load` reads back without parsing.
+"""
+from plisp import bytecode
+from typing import *
+import argparse
+import sys
+
+
+def main(argv : Optional[List[str]] = None) -> int:
+  parser = argparse.ArgumentParser(prog="plisp")
+  commands = parser.add_subparsers(dest="command", required=True)
+  compile_parser = commands.add_parser("compile", help="compile plisp files to .plc files")
+  compile_parser.add_argument("files", nargs="+", metavar="FILE")
+  compile_parser.add_argument("-o", "--output", help="path of the compiled file, for a single FILE")
+  compile_parser.add_argument("--float", dest="exact", action="store_false", help="read every number as a float")
+  args = parser.parse_args(argv)
+
+  if args.output is not None and len(args.files) > 1:
+    parser.error("-o needs a single FILE")
+  status = 0
+  for path in args.files:
+    try:
+      bytecode.compile_file(path, args.output, exact=args.exact)
+    except (OSError, ValueError) as e:
+      print("%s: %s" % (path, e), file=sys.stderr)
+      status = 1
+  return status
+
+
+if __name__ == '__main__':
+  sys.exit(main())
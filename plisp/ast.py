@@ -1,7 +1,16 @@
 from typing import *
+from fractions import Fraction
+import functools
+import gc
 import io
+import marshal
+import re
+import sys
+import threading
 
 class CodePos():
+  __slots__ = ('row', 'column')
+
   def __init__(self, row, column):
     self.row : int = row
     self.column : int = column
@@ -12,23 +21,136 @@ class CodePos():
   def copy(self):
     return CodePos(self.row, self.column)
 
-class Node():
-  position : CodePos
 
-  def __init__(self, position : CodePos):
-    self.position = position
+# Nodes keep their position packed in one int, row in the high bits.
+_COLUMN_BITS = 32
+_COLUMN_MASK = (1 << _COLUMN_BITS) - 1
+
+
+def pack_position(row : int, column : int) -> int:
+  return row << _COLUMN_BITS | column
+
+
+def _compile_and_run(node, context, tail=False):
+  return context.compile(node)(context, tail)
+
+
+class Node():
+  # `code` holds the compiled closure once the node has been evaluated.
+  __slots__ = ('_position', 'code')
+
+  def __init__(self, position : Union[CodePos, int]):
+    if type(position) is not int:
+      position = pack_position(position.row, position.column)
+    self._position = position
+
+  @property
+  def position(self) -> CodePos:
+    return CodePos(self._position >> _COLUMN_BITS, self._position & _COLUMN_MASK)
+
+  def __getattr__(self, name):
+    # Only reached while the `code` slot is empty: the node is compiled on its first
+    # evaluation, and the compiled closure fills the slot.
+    if name == 'code':
+      return functools.partial(_compile_and_run, self)
+    raise AttributeError(name)
+
+  def __getstate__(self):
+    # The compiled closure cannot be pickled; the node is compiled again where it is
+    # evaluated next.
+    state = {}
+    for cls in type(self).__mro__:
+      for name in getattr(cls, '__slots__', ()):
+        if name != 'code' and hasattr(self, name):
+          state[name] = getattr(self, name)
+    return state
+
+  def __setstate__(self, state):
+    for name, value in state.items():
+      setattr(self, name, value)
 
   def indent_str(self, indent=0):
     return ""
 
 
+SYMBOL = "symbol"
+NUMBER = "number"
+BOOLEAN = "boolean"
+STRING = "string"
+
+
+_RATIO = re.compile(r"[+-]?[0-9]+/[0-9]+")
+
+
+def classify_atom(name : str, str_value : bool, exact : bool = True) -> Tuple[str, Any]:
+  """
+  Returns the kind of an atom and the value of its literal, or None for symbols.
+  With `exact`, integers are read as int and ratios such as `1/3` as Fraction;
+  otherwise every number is a float, as in earlier versions.
+  """
+  if str_value:
+    return STRING, name
+  if name == "True":
+    return BOOLEAN, True
+  if name == "False":
+    return BOOLEAN, False
+  if exact:
+    try:
+      return NUMBER, int(name)
+    except ValueError:
+      pass
+    if _RATIO.fullmatch(name) and name.rpartition('/')[2].strip('0'):
+      return NUMBER, Fraction(name)
+  try:
+    return NUMBER, float(name)
+  except ValueError:
+    return SYMBOL, None
+
+
+def symbol(name : str) -> str:
+  """
+  The symbol of an identifier: the one interned copy of `name`, shared by the
+  atoms, scopes and namespaces naming it, so that their lookups hash it once and
+  compare it by pointer.
+  """
+  return sys.intern(name)
+
+
+@functools.lru_cache(maxsize=2**12)
+def _read_atom(name : str, exact : bool) -> Tuple[str, Any]:
+  # Symbols and numbers repeat a lot in a program: the names of symbols are interned,
+  # and recent atoms share their name and value objects.
+  value = classify_atom(name, False, exact)[1]
+  return (symbol(name) if value is None else name), value
+
+
 class AtomNode(Node):
+  # The kind of an atom follows from its value, see `kind`.
+  __slots__ = ('name', 'value')
   name : str
+  value : Any
 
-  def __init__(self, name : str, position : CodePos, str_value=False):
+  def __init__(self, name : str, position : Union[CodePos, int], str_value=False, exact=True):
     super().__init__(position)
-    self.name = name
-    self.str_value = str_value
+    if str_value:
+      self.name = self.value = name
+    else:
+      self.name, self.value = _read_atom(name, exact)
+
+  @property
+  def kind(self) -> str:
+    value = self.value
+    if value is None:
+      return SYMBOL
+    if type(value) is str:
+      return STRING
+    if type(value) is bool:
+      return BOOLEAN
+    return NUMBER
+
+  @property
+  def str_value(self) -> bool:
+    return type(self.value) is str
 
   def __str__(self):
     return self.indent_str()
@@ -40,12 +162,18 @@ class AtomNode(Node):
       return self.name
 
 class ListNode(Node):
+  # `body_scope` and `free_names`: layout of the frames of the function defined by
+  # this `define` or `lambda`, or of the frame of a `(define name body...)` block,
+  # and the names of the free variables of the function, set when first needed.
+  __slots__ = ('container', 'body_scope', 'free_names')
   container : List[Node]
+  name = None
 
-  def __init__(self, container : List[Node], position : CodePos):
+  def __init__(self, container : List[Node], position : Union[CodePos, int]):
     super().__init__(position)
-    self.name = None
     self.container = container
+    self.body_scope = None
+    self.free_names = None
 
   def __str__(self):
     return self.indent_str().strip()
@@ -63,136 +191,551 @@ class ListNode(Node):
     return self.container[item]
 
 
-def parse(stream) -> Union[List[ListNode], List[AtomNode], None]:
-  cur_pos = CodePos(1, 0)
-  current_line = stream.readline()
-
-  def get_char(allow_eof=True) -> Union[str, None]:
-    nonlocal current_line, current_char
-    if cur_pos.column >= len(current_line):
-      current_line = stream.readline()
-
-      if current_line is None or len(current_line) == 0:
-        if allow_eof:
-          current_char = None
-          return None
-        raise ValueError("Unexpected EOF at %s. " % get_position())
-
-      cur_pos.row += 1
-      cur_pos.column = 0
-
-    c = current_line[cur_pos.column]
-    cur_pos.column += 1
-    current_char = c
-    return c
-
-  def get_position() -> CodePos:
-    return cur_pos.copy()
-
-  current_char = get_char()
-
-  def get_current_char() -> str:
-    return current_char
-
-  def skip_white_and_get_cur():
-    if get_current_char() == ')':
-      raise ValueError("Miss matched ')' at %s. " % get_position())
-    while get_current_char() is not None and get_current_char().isspace():
-      get_char()
-    return get_current_char()
-
-  eval_list = []
-  while skip_white_and_get_cur() != None:
-    parse_res = _parse(get_char, get_position, get_current_char)
-    eval_list.append(parse_res)
-
-  return eval_list
-
-
-def _parse(get_char : Callable[[Optional[bool]], str],
-           get_position : Callable[[], CodePos],
-           get_cur_char : Callable[[], str]) -> Union[ListNode, AtomNode]:
-
-  c = get_cur_char()
-  while c is None or c.isspace():
-    c = get_char(False)
-
-  if c == '(':
-    return _parse_list(get_char, get_position, get_cur_char)
-  else:
-    return _parse_atom(get_char, get_position, get_cur_char)
-
-def _parse_list(get_char : Callable[[], str],
-                get_position : Callable[[], CodePos],
-                get_cur_char : Callable[[], str]) -> ListNode:
-
-  sub_nodes = []
-  pos = get_position()
-  get_char()
-
+_TOKEN = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<open>\()
+  | (?P<close>\))
+  | (?P<string>"[^"\\]*(?:\\.[^"\\]*)*"|'[^'\\]*(?:\\.[^'\\]*)*')
+  | (?P<unterminated>["'])
+  | (?P<atom>[^\s()"'][^\s()]*)
+""", re.VERBOSE | re.DOTALL)
+
+_ESCAPE = re.compile(r'\\(.)', re.DOTALL)
+_ESCAPES = {
+  '"': {'"': '"', 'n': '\n', 't': '\t', '\\': '\\', 'r': '\r'},
+  "'": {"'": "'", 'n': '\n', 't': '\t', '\\': '\\', 'r': '\r'},
+}
+
+OPEN = "open"
+CLOSE = "close"
+
+
+def _unescape(body : str, quote : str) -> str:
+  # Keeps the escaped quote and control characters, drops any other escaped character.
+  if '\\' not in body:
+    return body
+  escapes = _ESCAPES[quote]
+  return _ESCAPE.sub(lambda m: escapes.get(m.group(1), ''), body)
+
+
+class Parser():
+  """
+  Incremental parser. Source text can be fed in chunks of any size: `feed` returns
+  the top-level forms completed so far and `close` those left at the end of input.
+  Columns are 1-based; an atom takes the position of the character right after it.
+  Numbers are read as by `classify_atom` with `exact`.
+
+  With `arena`, every top-level list is packed once complete, and its sub-nodes
+  are only made again when it is used: large data files take a fraction of the
+  memory of their trees.
+  """
+
+  def __init__(self, exact : bool = True, arena : bool = False):
+    self.exact = exact
+    self.arena = _Arena() if arena else None
+    self.buffer = ""
+    # Index of buffer[0] in the whole input, and the line of that character.
+    self.offset = 0
+    self.row = 1
+    self.line_start = 0
+    # Lists still open, innermost last, as (position, sub_nodes) pairs.
+    self.stack = []
+    self.sub_nodes = []
+    self.last_kind = None
+    # Length and last two newlines of the whole input, for end-of-input errors.
+    self.length = 0
+    self.newlines = 0
+    self.last_newline = -1
+    self.prev_newline = -1
+
+  @property
+  def pending(self) -> bool:
+    """
+    Whether a form has been started but not completed yet.
+    """
+    return bool(self.stack) or bool(self.buffer)
+
+  def end_position(self) -> CodePos:
+    """
+    Position reported for errors at the end of input: that of the last character.
+    """
+    last = self.length - 1
+    if last < 0:
+      return CodePos(1, 0)
+    if self.last_newline == last:
+      return CodePos(self.newlines, last - self.prev_newline)
+    return CodePos(self.newlines + 1, last - self.last_newline)
+
+  def _track_end(self, chunk : str):
+    last_newline = chunk.rfind('\n')
+    if last_newline != -1:
+      prev_newline = chunk.rfind('\n', 0, last_newline)
+      self.prev_newline = self.length + prev_newline if prev_newline != -1 else self.last_newline
+      self.last_newline = self.length + last_newline
+      self.newlines += chunk.count('\n')
+    self.length += len(chunk)
+
+  def _fail(self, message : str):
+    # Drops the malformed input so that the parser can be fed again.
+    self.buffer = ""
+    self.offset = self.length
+    self.row = self.newlines + 1
+    self.line_start = self.last_newline + 1
+    self.stack = []
+    self.sub_nodes = []
+    self.last_kind = None
+    raise ValueError(message)
+
+  def feed(self, chunk : str, final : bool = False) -> List[Node]:
+    self._track_end(chunk)
+    text = self.buffer + chunk if self.buffer else chunk
+    length = len(text)
+    offset = self.offset
+    row = self.row
+    line_start = self.line_start - offset
+    stack = self.stack
+    forms = []
+    sub_nodes = self.sub_nodes if stack else forms
+    kind = self.last_kind
+    exact = self.exact
+    consumed = length
+
+    # The tree holds no reference cycles, so collecting while it grows is wasted work.
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+      for match in _TOKEN.finditer(text):
+        token_kind = match.lastgroup
+        start, end = match.span()
+
+        if not final and (token_kind == 'unterminated' or (end == length and (token_kind == 'atom' or token_kind == 'string'))):
+          # The token may continue in the next chunk.
+          consumed = start
+          break
+
+        if token_kind == 'space':
+          newline = text.rfind('\n', start, end)
+          if newline != -1:
+            row += text.count('\n', start, newline + 1)
+            line_start = newline + 1
+          continue
+        elif token_kind == 'open':
+          kind = OPEN
+          stack.append((pack_position(row, start - line_start + 1), sub_nodes))
+          sub_nodes = []
+          continue
+        elif token_kind == 'close':
+          kind = CLOSE
+          if not stack:
+            self._fail("Miss matched ')' at %s. " % CodePos(row, start - line_start + 1))
+          pos, parent_nodes = stack.pop()
+          node = ListNode(sub_nodes, pos)
+          if stack:
+            parent_nodes.append(node)
+            sub_nodes = parent_nodes
+          else:
+            forms.append(node if self.arena is None else self.arena.add([node])[0])
+            sub_nodes = forms
+          continue
+        elif token_kind == 'atom':
+          kind = SYMBOL
+          column = end - line_start + 1 if end < length else end - line_start
+          sub_nodes.append(AtomNode(text[start:end], pack_position(row, column), exact=exact))
+        elif token_kind == 'string':
+          kind = STRING
+          value = _unescape(text[start + 1:end - 1], text[start])
+          newline = text.rfind('\n', start, end)
+          if newline != -1:
+            row += text.count('\n', start, newline + 1)
+            line_start = newline + 1
+          column = end - line_start + 1 if end < length else end - line_start
+          sub_nodes.append(AtomNode(value, pack_position(row, column), str_value=True))
+        else:
+          self._fail("Unexpected EOF at %s. " % self.end_position())
+    finally:
+      if gc_enabled:
+        gc.enable()
+
+    self.buffer = text[consumed:]
+    self.offset = offset + consumed
+    self.row = row
+    self.line_start = line_start + offset
+    self.sub_nodes = sub_nodes
+    self.last_kind = kind
+
+    if final and stack:
+      if kind == OPEN:
+        self._fail("Unexpected EOF at %s. " % self.end_position())
+      self._fail("Unexpected EOF at %s" % self.end_position())
+
+    return forms
+
+  def close(self) -> List[Node]:
+    return self.feed("", final=True)
+
+
+def iter_parse(stream, chunk_size : int = 2**16, exact : bool = True) -> Iterator[Node]:
+  """
+  Reads `stream` chunk by chunk and yields every top-level form as soon as it is
+  complete, holding on to no more than the form being parsed.
+  """
+  parser = Parser(exact)
   while True:
-    token = _parse(get_char, get_position, get_cur_char)
-
-    if isinstance(token, AtomNode) and (len(token.name) > 0 or token.str_value):
-      sub_nodes.append(token)
-    elif isinstance(token, ListNode):
-      sub_nodes.append(token)
-
-    while get_cur_char() is not None and get_cur_char().isspace():
-      get_char()
-
-    if get_cur_char() == ')':
-      get_char()
+    chunk = stream.read(chunk_size)
+    if not chunk:
       break
+    yield from parser.feed(chunk)
+  yield from parser.close()
 
-    if get_cur_char() == None:
-      raise ValueError("Unexpected EOF at %s" % get_position())
 
-  return ListNode(sub_nodes, pos)
+def parse(stream, exact : bool = True, arena : bool = False) -> Union[List[ListNode], List[AtomNode], None]:
+  return Parser(exact, arena).feed(stream.read(), final=True)
 
-def _parse_atom(get_char : Callable[[], str],
-                get_position : Callable[[], CodePos],
-                get_cur_char : Callable[[], str]) -> AtomNode:
 
-  c = get_cur_char()
-  token = ""
+# Version of the encoding written by `dumps`.
+DUMP_FORMAT = 3
 
-  if c == "\'" or c == '\"':
-    return _parse_str(get_char, get_position, get_cur_char)
 
-  while not c.isspace() and c != '(' and c != ')':
-    token += c
-    c = get_char()
-    if c is None:
-      break
+def _write_varint(out : bytearray, value : int):
+  # 7 bits per byte, the low bits first; the high bit tells that more bytes follow.
+  while value >= 0x80:
+    out.append(value & 0x7f | 0x80)
+    value >>= 7
+  out.append(value)
 
-  return AtomNode(token, get_position())
 
-def _parse_str(get_char, get_position, get_cur_char) -> AtomNode:
+def _varint_size(value : int) -> int:
+  return max(1, (value.bit_length() + 6) // 7)
 
-  quote = get_cur_char()
-
-  token = ""
 
+def _read_varint(stream : bytes, i : int) -> Tuple[int, int]:
+  value = shift = 0
   while True:
-    c = get_char(False)
-    if c == '\\':
-      c = get_char(False)
-      if c == quote:
-        token += quote
-      if c == 'n':
-        token += '\n'
-      if c == 't':
-        token += '\t'
-      if c == '\\':
-        token += c
-      if c == 'r':
-        token += '\r'
-    elif c == quote:
-      get_char()
-      break
+    byte = stream[i]
+    i += 1
+    value |= (byte & 0x7f) << shift
+    if byte < 0x80:
+      return value, i
+    shift += 7
+
+
+def _atom_width(name : str, value) -> int:
+  # Characters of the atom in the source, when its string has no escapes.
+  return len(name) + 2 if type(value) is str else len(name)
+
+
+def _entry(position : int, previous : int, payload : int, width : Optional[int]) -> Tuple[int, ...]:
+  # The varints of a node written after its parent or previous sibling at `previous`:
+  # the index of an atom of `width`, or the size of a list (width None), as `payload`.
+  # A node one space further, as in most sources, is written as one varint.
+  is_list = width is None
+  row, column = position >> _COLUMN_BITS, position & _COLUMN_MASK
+  previous_row, previous_column = previous >> _COLUMN_BITS, previous & _COLUMN_MASK
+  if row == previous_row and column == previous_column + 1 + (0 if is_list else width):
+    return (payload << 2 | 2 | is_list,)
+  if row == previous_row and column >= previous_column:
+    return ((column - previous_column) << 3 | is_list, payload)
+  delta = row - previous_row
+  delta = delta << 1 if delta >= 0 else -delta << 1 | 1
+  return (delta << 3 | 4 | is_list, column, payload)
+
+
+def _atom_key(node : 'AtomNode') -> Tuple[str, type, Any]:
+  return (node.name, type(node.value), node.value)
+
+
+def dumps(node_list : List[Node]) -> bytes:
+  """
+  Encodes the trees of `node_list`, without their compiled code, for `loads`. The
+  atoms are written once in a table, the most frequent first; the nodes follow in
+  pre-order as varints: the position of a node relative to its parent or previous
+  sibling, then an atom as its index in the table, and a list as the size of its
+  sub-nodes in bytes, so that they can be skipped until they are needed.
+  """
+  # The distinct atoms, how often they occur, and the atoms in the order they are
+  # written, as indexes of the former.
+  seen : Dict[Tuple[str, type, Any], int] = {}
+  counts = []
+  occurrences = []
+  for node in _atoms_backwards(node_list):
+    i = seen.setdefault(_atom_key(node), len(counts))
+    if i == len(counts):
+      counts.append(0)
+    counts[i] += 1
+    occurrences.append(i)
+  order = sorted(range(len(counts)), key=counts.__getitem__, reverse=True)
+  keys = list(seen)
+  keys = [keys[i] for i in order]
+  index = [0] * len(order)
+  for rank, i in enumerate(order):
+    index[i] = rank
+  payloads = [index[i] for i in occurrences]
+
+  # The table: names, then how to read their values back, see `_Dump`.
+  names = []
+  kinds = []
+  values = {}
+  widths = []
+  for i, (name, value_type, value) in enumerate(keys):
+    names.append(name)
+    widths.append(_atom_width(name, value))
+    if value is None:
+      kinds.append('y')
+    elif value_type is str and value == name:
+      kinds.append('s')
+    elif value_type is int and _parses_as(int, name, value):
+      kinds.append('i')
+    elif value_type is float and _parses_as(float, name, value):
+      kinds.append('f')
     else:
-      token += c
-
-
-  return AtomNode(token, get_position(), str_value=True)
+      kinds.append('v')
+      # Fractions are not marshalled.
+      values[i] = (value.numerator, value.denominator) if value_type is Fraction else value
+
+  stream = _write_nodes(node_list, payloads, widths)
+  size = bytearray()
+  _write_varint(size, len(stream))
+  return marshal.dumps((DUMP_FORMAT, names, "".join(kinds), values, bytes(size + stream)))
+
+
+def _atoms_backwards(node_list : List[Node]) -> Iterator['AtomNode']:
+  # The atoms of the trees, last first, as `_write_nodes` writes them.
+  stack = list(node_list)
+  while stack:
+    node = stack.pop()
+    if isinstance(node, AtomNode):
+      yield node
+    else:
+      stack.extend(node.container)
+
+
+def _write_nodes(node_list : List[Node], payloads : List[int], widths : List[int]) -> bytearray:
+  """
+  The nodes of the trees of `node_list`, encoded as described in `dumps`, where
+  `payloads` are the indexes of their atoms in the order of `_atoms_backwards`,
+  and `widths` those of the atoms of the table.
+  """
+  # The stream is written backwards, from the last node to the first, so that the
+  # sub-nodes of a list are written, and their size known, before the list.
+  stream = bytearray()
+  payloads = iter(payloads)
+
+  def write_backwards(*varints : int):
+    entry = bytearray()
+    for value in varints:
+      _write_varint(entry, value)
+    entry.reverse()
+    stream.extend(entry)
+
+  stack : List[Tuple[Node, int, Optional[int]]] = []
+  previous = 0
+  for node in node_list:
+    stack.append((node, previous, None))
+    previous = node._position
+  while stack:
+    node, previous, start = stack.pop()
+    if isinstance(node, AtomNode):
+      payload = next(payloads)
+      width = widths[payload]
+      # The usual case of `_entry`, where the packed positions differ by the columns.
+      if node._position == previous + 1 + width and payload < 0x20:
+        stream.append(payload << 2 | 2)
+      else:
+        write_backwards(*_entry(node._position, previous, payload, width))
+    elif start is None:
+      stack.append((node, previous, len(stream)))
+      previous = node._position
+      for sub_node in node.container:
+        stack.append((sub_node, previous, None))
+        previous = sub_node._position
+    elif node._position == previous + 1 and len(stream) - start < 0x1000:
+      # The varint of most lists, backwards.
+      value = (len(stream) - start) << 2 | 3
+      if value < 0x80:
+        stream.append(value)
+      else:
+        stream.append(value >> 7)
+        stream.append(value & 0x7f | 0x80)
+    else:
+      write_backwards(*_entry(node._position, previous, len(stream) - start, None))
+  stream.reverse()
+  return stream
+
+
+
+def _parses_as(number_type : type, name : str, value) -> bool:
+  try:
+    number = number_type(name)
+  except ValueError:
+    return False
+  return number == value and str(number) == str(value)
+
+
+class _Dump:
+  """
+  The table and the encoded nodes of a dump, from which `_LoadedListNode`s read
+  their sub-nodes.
+  """
+  __slots__ = ('atoms', 'widths', 'stream')
+
+  def __init__(self, names : List[str], kinds : str, values : Dict[int, Any], stream : bytes):
+    self.stream = stream
+    self.atoms = atoms = []
+    for i, (name, kind) in enumerate(zip(names, kinds)):
+      if kind == 'y':
+        atoms.append((symbol(name), None))
+      elif kind == 's':
+        atoms.append((name, name))
+      elif kind == 'i':
+        atoms.append((name, int(name)))
+      elif kind == 'f':
+        atoms.append((name, float(name)))
+      else:
+        value = values[i]
+        atoms.append((name, Fraction(*value) if type(value) is tuple else value))
+    self.widths = [_atom_width(name, value) for name, value in atoms]
+
+  def read_list(self, i : int, end : int, position : int) -> List[Node]:
+    """
+    The nodes encoded from `i` to `end`, as sub-nodes of a list at `position`.
+    """
+    stream = self.stream
+    atoms = self.atoms
+    widths = self.widths
+    new = object.__new__
+    row = position >> _COLUMN_BITS
+    column = position & _COLUMN_MASK
+    nodes = []
+    # No reference cycles either, see `Parser.feed`.
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+      while i < end:
+        # See `_entry`.
+        header = stream[i]
+        i += 1
+        if header >= 0x80:
+          header, i = _read_varint(stream, i - 1)
+        if header & 2:
+          payload = header >> 2
+          column += 1 if header & 1 else 1 + widths[payload]
+        else:
+          if header & 4:
+            delta = header >> 4
+            row += -delta if header & 8 else delta
+            column, i = _read_varint(stream, i)
+          else:
+            column += header >> 3
+          payload = stream[i]
+          i += 1
+          if payload >= 0x80:
+            payload, i = _read_varint(stream, i - 1)
+        if header & 1:
+          node = new(_LoadedListNode)
+          node.body_scope = None
+          node.free_names = None
+          node._dump = self
+          node._offset = i
+          i = node._end = i + payload
+        else:
+          node = new(AtomNode)
+          node.name, node.value = atoms[payload]
+        node._position = row << _COLUMN_BITS | column
+        nodes.append(node)
+    finally:
+      if gc_enabled:
+        gc.enable()
+    return nodes
+
+
+_read_lock = threading.Lock()
+
+
+class _LoadedListNode(ListNode):
+  """
+  A list rebuilt by `loads`: its sub-nodes are read from the dump when they are
+  first needed, so that only the parts of a program that are evaluated are read.
+  """
+  __slots__ = ('_dump', '_offset', '_end')
+
+  def __getattr__(self, name):
+    if name != 'container':
+      return super().__getattr__(name)
+    with _read_lock:
+      # Unless another thread has read them meanwhile.
+      dump = self._dump
+      if dump is not None:
+        self.container = dump.read_list(self._offset, self._end, self._position)
+        self._dump = None
+    return self.container
+
+  def __getstate__(self):
+    state = super().__getstate__()
+    del state['_dump'], state['_offset'], state['_end']
+    return state
+
+  def __reduce_ex__(self, protocol):
+    # Copied as a plain list, read in full.
+    return _new_list_node, (), self.__getstate__()
+
+
+def _new_list_node() -> ListNode:
+  return object.__new__(ListNode)
+
+
+class _Arena(_Dump):
+  """
+  The trees of a `Parser` with `arena`, in the encoding of `dumps`, with their
+  atoms in one table: a few bytes per node until a list is used and its sub-nodes
+  read back.
+  """
+  __slots__ = ('index',)
+
+  def __init__(self):
+    self.atoms = []
+    self.widths = []
+    self.stream = bytearray()
+    self.index : Dict[Tuple[str, type, Any], int] = {}
+
+  def add(self, node_list : List[Node]) -> List[Node]:
+    """
+    Moves the trees of `node_list` into the arena and returns them, read back
+    lazily.
+    """
+    payloads = []
+    for node in _atoms_backwards(node_list):
+      key = _atom_key(node)
+      i = self.index.get(key)
+      if i is None:
+        i = self.index[key] = len(self.atoms)
+        self.atoms.append((node.name, node.value))
+        self.widths.append(_atom_width(node.name, node.value))
+      payloads.append(i)
+    start = len(self.stream)
+    self.stream += _write_nodes(node_list, payloads, self.widths)
+    return self.read_list(start, len(self.stream), 0)
+
+
+def loads(data : bytes) -> List[Node]:
+  """
+  Rebuilds the trees encoded by `dumps`: their top-level nodes at once, and the
+  sub-nodes of a list when it is first used. Raises ValueError on data of another
+  format.
+  """
+  try:
+    version, *table = marshal.loads(data)
+  except (EOFError, TypeError, ValueError):
+    raise ValueError("Not a dump of plisp nodes. ")
+  if version != DUMP_FORMAT:
+    raise ValueError("Unsupported dump format %r. " % (version,))
+  gc_enabled = gc.isenabled()
+  gc.disable()
+  try:
+    dump = _Dump(*table)
+    size, start = _read_varint(dump.stream, 0)
+    return dump.read_list(start, start + size, 0)
+  except (TypeError, ValueError, IndexError, KeyError):
+    raise ValueError("Corrupted dump of plisp nodes. ")
+  finally:
+    if gc_enabled:
+      gc.enable()
@@ -0,0 +1,134 @@
+from plisp import ast
+from typing import *
+import hashlib
+import io
+import mmap
+import os
+import struct
+import tempfile
+
+# A compiled file is this header followed by `ast.dumps` of the program.
+MAGIC = b"PLSP"
+VERSION = 2
+# Magic, version, flags, then the modification time (ns), size and SHA-256 of the source.
+HEADER = struct.Struct("<4sHH8xqq32s")
+EXACT = 1
+
+SUFFIX = ".plc"
+
+
+class Program(list):
+  """
+  The top-level forms of a compiled program. It is a list of nodes, so that
+  `evaluate_list(program.code, program)` evaluates it like parsed source.
+  """
+
+  def __init__(self, nodes : Iterable[ast.Node], source_path : Optional[str] = None):
+    super().__init__(nodes)
+    self.source_path = source_path
+    self._code : Optional[str] = None
+
+  @property
+  def code(self) -> str:
+    """
+    The source, read when first needed for tracebacks; empty when it is not
+    available.
+    """
+    if self._code is None:
+      self._code = ""
+      if self.source_path is not None:
+        try:
+          with open(self.source_path, encoding="utf-8") as f:
+            self._code = f.read()
+        except OSError:
+          pass
+    return self._code
+
+
+def compiled_path(source_path : str) -> str:
+  return os.path.splitext(source_path)[0] + SUFFIX
+
+
+def write_atomic(path : str, data : bytes):
+  """
+  Writes `data` aside and renames it to `path`, so that readers never see a
+  partial file.
+  """
+  fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+  try:
+    with os.fdopen(fd, "wb") as f:
+      f.write(data)
+    os.replace(temp_path, path)
+  except BaseException:
+    try:
+      os.unlink(temp_path)
+    except OSError:
+      pass
+    raise
+
+
+def compile_file(source_path : str, output_path : Optional[str] = None, exact : bool = True) -> Program:
+  """
+  Parses `source_path` and writes the program to `output_path`, by default next to
+  it with the `.plc` suffix. Raises ValueError on a parse error.
+  """
+  # Stat before reading: a source changed in between then looks newer than the
+  # program, rather than the program looking up to date with the changed source.
+  stat = os.stat(source_path)
+  with open(source_path, "rb") as f:
+    source = f.read()
+  nodes = ast.parse(io.StringIO(source.decode("utf-8")), exact)
+  header = HEADER.pack(MAGIC, VERSION, EXACT if exact else 0, stat.st_mtime_ns, len(source), hashlib.sha256(source).digest())
+  write_atomic(output_path or compiled_path(source_path), header + ast.dumps(nodes))
+  return Program(nodes, source_path)
+
+
+def load(path : str, source_path : Optional[str] = None, exact : Optional[bool] = None) -> Program:
+  """
+  Loads the program compiled in `path`, mapped in memory. With `source_path`, the
+  program must have been compiled from that source as it is now: its modification
+  time and size are compared, then its hash if they differ. With `exact`, it must
+  have been compiled with that flag. Raises ValueError otherwise, or when the file
+  was written by another version.
+  """
+  with open(path, "rb") as f:
+    try:
+      mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:
+      raise ValueError("%s is empty. " % path)
+  with mapped, memoryview(mapped) as view:
+    if len(view) < HEADER.size:
+      raise ValueError("%s is not a compiled plisp program. " % path)
+    magic, version, flags, mtime, size, digest = HEADER.unpack_from(view)
+    if magic != MAGIC:
+      raise ValueError("%s is not a compiled plisp program. " % path)
+    if version != VERSION:
+      raise ValueError("%s was compiled by another version of plisp. " % path)
+    if exact is not None and bool(flags & EXACT) != exact:
+      raise ValueError("%s was compiled with exact=%s. " % (path, bool(flags & EXACT)))
+    if source_path is not None:
+      stat = os.stat(source_path)
+      if (stat.st_mtime_ns, stat.st_size) != (mtime, size):
+        with open(source_path, "rb") as f:
+          if hashlib.sha256(f.read()).digest() != digest:
+            raise ValueError("%s is out of date with %s. " % (path, source_path))
+    with view[HEADER.size:] as payload:
+      nodes = ast.loads(payload)
+  return Program(nodes, source_path)
+
+
+def load_source(source_path : str, exact : bool = True) -> Program:
+  """
+  The program of `source_path`, loaded from its compiled file when it is up to date,
+  or parsed and compiled again otherwise, like Python does with `.pyc` files.
+  """
+  try:
+    return load(compiled_path(source_path), source_path, exact)
+  except (OSError, ValueError):
+    pass
+  try:
+    return compile_file(source_path, exact=exact)
+  except OSError:
+    # The directory is read-only: the program is still returned.
+    with open(source_path, encoding="utf-8") as f:
+      return Program(ast.parse(f, exact), source_path)
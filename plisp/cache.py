@@ -0,0 +1,103 @@
+from plisp import ast
+from plisp.bytecode import write_atomic
+from typing import *
+from collections import OrderedDict
+import hashlib
+import io
+import os
+import threading
+
+
+class ProgramCache:
+  """
+  Parsed programs, keyed by the hash of their source, so that a source seen again
+  is not parsed again. The trees are shared by every evaluation of the source, and
+  so is the code compiled on them when they are first evaluated. They must not be
+  modified: `fold_constants` works on trees of their own.
+
+  The least recently used programs are dropped once the sources of those kept
+  add up to more than `max_bytes`. With `directory`, every program parsed is also
+  written there by `ast.dumps`, and read back from it when it is not in memory,
+  e.g. after a restart.
+  """
+
+  def __init__(self, max_bytes : int = 2**26, directory : Optional[str] = None):
+    self.max_bytes = max_bytes
+    self.directory = directory
+    self.size = 0
+    self.hits = 0
+    self.misses = 0
+    self._programs : 'OrderedDict[str, Tuple[List[ast.Node], int]]' = OrderedDict()
+    self._lock = threading.Lock()
+    if directory is not None:
+      os.makedirs(directory, exist_ok=True)
+
+  def __len__(self):
+    return len(self._programs)
+
+  @staticmethod
+  def key(source : bytes, exact : bool) -> str:
+    return hashlib.sha256(source).hexdigest() + ("" if exact else "-float")
+
+  def parse(self, code : str, exact : bool = True) -> List[ast.Node]:
+    """
+    `ast.parse` of `code`, from the cache when possible. Parse errors are raised
+    every time, they are not cached.
+    """
+    source = code.encode("utf-8", "surrogatepass")
+    key = self.key(source, exact)
+    with self._lock:
+      entry = self._programs.get(key)
+      if entry is not None:
+        self._programs.move_to_end(key)
+        self.hits += 1
+        return list(entry[0])
+      self.misses += 1
+
+    node_list = self._read(key)
+    if node_list is None:
+      node_list = ast.parse(io.StringIO(code), exact)
+      self._write(key, node_list)
+    self._add(key, node_list, len(source))
+    return list(node_list)
+
+  def clear(self):
+    """
+    Drops the programs kept in memory; those written to `directory` stay.
+    """
+    with self._lock:
+      self._programs.clear()
+      self.size = 0
+
+  def _add(self, key : str, node_list : List[ast.Node], size : int):
+    if size > self.max_bytes:
+      return
+    with self._lock:
+      if key in self._programs:
+        return
+      self._programs[key] = (node_list, size)
+      self.size += size
+      while self.size > self.max_bytes:
+        _, (_, dropped) = self._programs.popitem(last=False)
+        self.size -= dropped
+
+  def _path(self, key : str) -> str:
+    return os.path.join(self.directory, key + ".plc")
+
+  def _read(self, key : str) -> Optional[List[ast.Node]]:
+    if self.directory is None:
+      return None
+    try:
+      with open(self._path(key), "rb") as f:
+        return ast.loads(f.read())
+    except (OSError, ValueError):
+      # Missing, or written by another version: parsed again, and rewritten.
+      return None
+
+  def _write(self, key : str, node_list : List[ast.Node]):
+    if self.directory is None:
+      return
+    try:
+      write_atomic(self._path(key), ast.dumps(node_list))
+    except OSError:
+      pass
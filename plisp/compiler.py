@@ -0,0 +1,257 @@
+from plisp import ast
+from plisp.entity import Entity, UserFunc, If, built_in_namespace
+from plisp.environment import Scope, UNBOUND
+from typing import *
+
+Code = Callable[..., Any]
+
+
+class TailCall:
+  """
+  A call to a user function in tail position. It is returned to the trampoline in
+  `Context.call` instead of being made, with the arguments already evaluated into
+  the slots of the callee's frame.
+  """
+  __slots__ = ('func', 'slots')
+
+  def __init__(self, func : UserFunc, slots : list):
+    self.func = func
+    self.slots = slots
+
+
+def compile_node(node : ast.Node, scope : Optional[Scope] = None) -> Code:
+  """
+  Compiles `node` into a closure of signature `code(context, tail=False)` and caches
+  it in `node.code`. Names are resolved against `scope`, the lexical scope the node
+  is evaluated in; sub-nodes are compiled when they are first evaluated. With `tail`,
+  the node is in tail position of a user function and a call it makes to a user
+  function is returned as a `TailCall`.
+  """
+  if isinstance(node, ast.AtomNode):
+    code = _compile_atom(node, scope)
+  elif isinstance(node, ast.ListNode):
+    code = _compile_list(node, scope)
+  else:
+    raise TypeError("Unexpected type: %s of node" % type(node))
+  node.code = code
+  return code
+
+
+def _compile_reference(name : str, scope : Optional[Scope], default, missing : Code) -> Code:
+  """
+  `default` is returned when `name` is bound nowhere; `missing(context, value)` is
+  called with it when `default` is None.
+  """
+  address = scope.resolve(name) if scope is not None else None
+
+  def lookup_outer(context, frame):
+    while frame is not None:
+      value = frame.get(name)
+      if value is not UNBOUND:
+        return value
+      frame = frame.parent
+    for np in reversed(context.namespace_stack):
+      value = np.get(name)
+      if value is not None:
+        return value
+      if name in np:
+        break
+    if default is None:
+      return missing(context)
+    return default
+
+  if address is None:
+    def code(context, tail=False):
+      for np in reversed(context.namespace_stack):
+        value = np.get(name)
+        if value is not None:
+          return value
+        if name in np:
+          break
+      if default is None:
+        return missing(context)
+      return default
+
+    return code
+
+  depth, index = address
+
+  if depth == 0:
+    def code(context, tail=False):
+      frame = context.frame
+      try:
+        value = frame.slots[index]
+      except IndexError:
+        value = UNBOUND
+      if value is UNBOUND:
+        # Not bound yet in this frame, e.g. a local referenced before its `define`.
+        return lookup_outer(context, frame.parent)
+      return value
+
+    return code
+
+  def code(context, tail=False):
+    frame = context.frame
+    for _ in range(depth):
+      frame = frame.parent
+    try:
+      value = frame.slots[index]
+    except IndexError:
+      value = UNBOUND
+    if value is UNBOUND:
+      return lookup_outer(context, frame.parent)
+    return value
+
+  return code
+
+
+def _compile_atom(atom : ast.AtomNode, scope : Optional[Scope]) -> Code:
+  if atom.kind == ast.STRING:
+    value = atom.value
+
+    def code(context, tail=False):
+      return value
+
+    return code
+
+  def missing(context):
+    context.raise_eval_exception("Unknown literal '%s'. " % atom)
+
+  name = atom.name
+  literal = atom.value
+  reference = _compile_reference(name, scope, literal, missing)
+  if literal is None or (scope is not None and scope.resolve(name) is not None):
+    return reference
+
+  def code(context, tail=False):
+    # A literal only needs a namespace lookup once it was shadowed by a global define.
+    if name in context.shadowed_literals:
+      return reference(context)
+    return literal
+
+  return code
+
+
+def compile_head(head : ast.Node, scope : Optional[Scope]) -> Code:
+  """
+  The code resolving the operator `head` of a list, None if it is not bound: a
+  literal head is only an operator once a define shadowed it.
+  """
+  if isinstance(head, ast.ListNode):
+    def resolve(context, tail=False):
+      return head.code(context)
+
+    return resolve
+
+  def missing(context):
+    return None
+
+  return _compile_reference(head.name, scope, None, missing)
+
+
+def _compile_list(node : ast.ListNode, scope : Optional[Scope]) -> Code:
+  if len(node) == 0:
+    def code(context, tail=False):
+      context.raise_eval_exception("Cannot evaluate an empty list. ")
+
+    return code
+
+  head = node[0]
+  resolve = compile_head(head, scope)
+  container = node.container
+
+  def code(context, tail=False):
+    operator = resolve(context)
+    if operator is None:
+      context.raise_eval_exception("Unknown literal '%s'. " % head)
+
+    if not isinstance(operator, Entity):
+      operator = Entity(operator)
+
+    stack_trace = context.stack_trace
+    stack_trace.append(operator)
+    try:
+      if tail:
+        if isinstance(operator, UserFunc):
+          return TailCall(operator, context.bind_args(operator, container))
+        if isinstance(operator, If):
+          return operator.reduce(context, node, True)
+      return operator.reduce(context, node)
+    finally:
+      stack_trace.pop()
+
+  if len(container) == 3 and isinstance(head, ast.AtomNode) and (scope is None or scope.resolve(head.name) is None):
+    builtin = built_in_namespace.get(head.name)
+    if builtin is not None and builtin.binary is not None:
+      return _compile_binary(node, scope, builtin, code)
+  return code
+
+
+def _operand(node : ast.Node, scope : Optional[Scope]):
+  """
+  How `_compile_binary` gets the value of an operand without calling its code: as
+  (value, None) for a literal no frame can shadow, (None, index) for a variable of
+  the current frame, and (None, None) otherwise.
+  """
+  if isinstance(node, ast.AtomNode) and node.kind != ast.STRING:
+    address = scope.resolve(node.name) if scope is not None else None
+    if address is None:
+      return node.value, None
+    if address[0] == 0:
+      return None, address[1]
+  return None, None
+
+
+def _compile_binary(node : ast.ListNode, scope : Optional[Scope], builtin, generic : Code) -> Code:
+  """
+  `(op a b)` where `op` names a builtin with a `binary` function and no frame binds
+  it. Until the context binds it in a namespace (see `Context.shadowed_builtins`),
+  two numbers are computed right away and anything else goes through the `apply`
+  of the builtin; then `generic`, the code of the list, takes over.
+  """
+  name = node.container[0].name
+  binary = builtin.binary
+  left = node.container[1]
+  right = node.container[2]
+  left_value, left_index = _operand(left, scope)
+  right_value, right_index = _operand(right, scope)
+  has_literal = left_value is not None or right_value is not None
+  # Literals and variables of the current frame are read without calling their code,
+  # and without putting the builtin on the trace, since reading them cannot fail.
+  leaves = (left_value is not None or left_index is not None) and (right_value is not None or right_index is not None)
+
+  def code(context, tail=False):
+    shadowed = context.shadowed_builtins
+    if shadowed and name in shadowed:
+      return generic(context, tail)
+    if has_literal and context.shadowed_literals:
+      return generic(context, tail)
+
+    if leaves:
+      a = left_value
+      b = right_value
+      if a is None or b is None:
+        slots = context.frame.slots
+        if a is None and left_index < len(slots):
+          a = slots[left_index]
+        if b is None and right_index < len(slots):
+          b = slots[right_index]
+      a_type = type(a)
+      b_type = type(b)
+      if (a_type is float or a_type is int) and (b_type is float or b_type is int):
+        return binary(a, b)
+
+    stack_trace = context.stack_trace
+    stack_trace.append(builtin)
+    try:
+      a = left.code(context) if left_value is None else left_value
+      b = right.code(context) if right_value is None else right_value
+      a_type = type(a)
+      b_type = type(b)
+      if (a_type is float or a_type is int) and (b_type is float or b_type is int):
+        return binary(a, b)
+      return builtin.apply(context, node, [a, b])
+    finally:
+      stack_trace.pop()
+
+  return code
@@ -1,6 +1,9 @@
 from typing import *
+from fractions import Fraction
+import functools
+import operator
 import re
-from plisp.ast import ListNode, AtomNode, Node
+from plisp.ast import ListNode, AtomNode, Node, symbol
 import plisp.constants as C
 
 built_in_namespace = {}
@@ -13,13 +16,16 @@ class Entity:
   def reduce(self, context, _list : ListNode):
     context.raise_eval_exception("%r of %s does not have method %r" % (self.value, type(self), "reduce"))
 
+  def __str__(self):
+    return "<Entity %r>" % (self.value,)
+
   def __repr__(self):
     return str(self)
 
 def built_in(name : str, *args, **kwargs):
   def cls_wrapper(cls : type):
     global built_in_namespace
-    built_in_namespace[name] = cls(*args, **kwargs)
+    built_in_namespace[symbol(name)] = cls(*args, **kwargs)
     cls.op_name = name
     return cls
   return cls_wrapper
@@ -30,8 +36,140 @@ class Null(Entity):
   def __str__(self):
     return "null"
 
+  def __eq__(self, other):
+    return isinstance(other, Null)
+
+  def __hash__(self):
+    return hash(Null)
+
+  def __iter__(self):
+    return iter(())
+
+  def __len__(self):
+    return 0
+
+null = built_in_namespace["null"]
+
+class Pair:
+  """
+  A cons cell. Pairs are never modified, so lists built from them share their
+  tails; `length` is the number of pairs of the list it starts, or None if the
+  list does not end with null.
+  """
+  __slots__ = ('car', 'cdr', 'length')
+
+  def __init__(self, car, cdr):
+    self.car = car
+    self.cdr = cdr
+    if type(cdr) is Pair:
+      self.length = cdr.length + 1 if cdr.length is not None else None
+    else:
+      self.length = 1 if isinstance(cdr, Null) else None
+
+  def __iter__(self):
+    pair = self
+    while type(pair) is Pair:
+      yield pair.car
+      pair = pair.cdr
+
+  def __len__(self):
+    if self.length is None:
+      raise TypeError("The list does not end with null. ")
+    return self.length
+
+  def __repr__(self):
+    # Printed like the nested tuples lists used to be, without recursing down the list.
+    parts = []
+    pair = self
+    while type(pair) is Pair:
+      parts.append("(%r, " % (pair.car,))
+      pair = pair.cdr
+    return "".join(parts) + repr(pair) + ")" * len(parts)
+
+  def __str__(self):
+    return repr(self)
+
+
+class Rope:
+  """
+  A string built by `strcat` and only joined once it is printed or compared. Its
+  pieces are the first `front_count` strings of `front`, in reverse order, then the
+  first `count` strings of `parts`; a rope extends these lists in place when no other
+  rope has done it already, so building a string piece by piece, at either end,
+  takes linear time even though ropes, like strings, are never modified.
+  """
+  __slots__ = ('parts', 'count', 'front', 'front_count', 'length', 'text')
+
+  # Shorter concatenations are plain strings, for which copying is cheaper.
+  MIN_LENGTH = 256
+
+  def __init__(self, parts : List[str], length : int, front : List[str] = (), front_count : int = 0):
+    self.parts = parts
+    self.count = len(parts)
+    self.front = front
+    self.front_count = front_count
+    self.length = length
+    self.text = None
+
+  def concat(self, piece : str) -> 'Rope':
+    parts = self.parts
+    if len(parts) != self.count:
+      parts = parts[:self.count]
+    parts.append(piece)
+    return Rope(parts, self.length + len(piece), self.front, self.front_count)
+
+  def prepend(self, piece : str) -> 'Rope':
+    front = self.front
+    if len(front) != self.front_count or type(front) is not list:
+      front = list(front[:self.front_count])
+    front.append(piece)
+    parts = self.parts
+    if len(parts) != self.count:
+      parts = parts[:self.count]
+    return Rope(parts, self.length + len(piece), front, len(front))
+
+  def __str__(self):
+    if self.text is None:
+      front = self.front[:self.front_count]
+      self.text = "".join(reversed(front)) + "".join(self.parts[:self.count])
+    return self.text
+
+  def __repr__(self):
+    return repr(str(self))
+
+  def __len__(self):
+    return self.length
+
+  def __hash__(self):
+    return hash(str(self))
+
+  def __eq__(self, other):
+    if isinstance(other, (str, Rope)):
+      return str(self) == str(other)
+    return NotImplemented
+
+  def __lt__(self, other):
+    if isinstance(other, (str, Rope)):
+      return str(self) < str(other)
+    return NotImplemented
+
+  def __gt__(self, other):
+    if isinstance(other, (str, Rope)):
+      return str(self) > str(other)
+    return NotImplemented
+
+
+def make_list(values : Iterable) -> Union[Pair, Null]:
+  result = null
+  for value in reversed(list(values)):
+    result = Pair(value, result)
+  return result
+
 class Operator(Entity):
   op_name = ""
+  # The operator on two numbers, as a plain function, for builtins whose calls on two
+  # numbers are compiled into a fast path skipping `reduce`.
+  binary = None
 
   def __str__(self):
     return "<Operator %r>" % self.op_name
@@ -55,20 +193,47 @@ class Scannable(Operator):
     raise NotImplementedError()
 
   def reduce(self, context, _list : ListNode):
-    s = self.begin()
+    if self.binary is not None:
+      return self.apply(context, _list, [node.code(context) for node in _list.container[1:]])
 
+    s = self.begin()
     if self.is_reversed():
       _list = reversed(_list.container[1:])
     else:
       _list = _list.container[1:]
 
     for node in _list:
-      value = context.evaluate(node)
+      value = node.code(context)
       if not self.type_check(type(value)):
         context.raise_eval_exception("Operator %s got an unexpected type: %s:%s" % (self.op_name, node, type(value)))
       s = self.step(s, value)
     return s
 
+  def apply(self, context, _list : Optional[ListNode], values : list):
+    """
+    Same as `reduce`, with the arguments already evaluated into `values`. `_list`
+    is None when the values do not come from its arguments, e.g. in `fold`.
+    """
+    if self.binary is not None:
+      for value in values:
+        value_type = type(value)
+        if value_type is not float and value_type is not int:
+          break
+      else:
+        return functools.reduce(self.binary, values, self.begin())
+    s = self.begin()
+    nodes = _list.container[1:] if _list is not None else [None] * len(values)
+    pairs = zip(nodes, values)
+    if self.is_reversed():
+      pairs = reversed(list(pairs))
+    for node, value in pairs:
+      if not self.type_check(type(value)):
+        if node is None:
+          context.raise_eval_exception("Operator %s got an unexpected type: %s" % (self.op_name, type(value)))
+        context.raise_eval_exception("Operator %s got an unexpected type: %s:%s" % (self.op_name, node, type(value)))
+      s = self.step(s, value)
+    return s
+
 class BinaryOp(Operator):
 
   @staticmethod
@@ -80,10 +245,22 @@ class BinaryOp(Operator):
     raise NotImplementedError()
 
   def reduce(self, context, _list : ListNode):
-    if len(_list) != 3:
+    container = _list.container
+    if len(container) != 3:
       context.raise_eval_exception("Operator %s needs exactly 2 parameters. " % self.op_name)
-    left = context.evaluate(_list[1])
-    right = context.evaluate(_list[2])
+    left = container[1].code(context)
+    right = container[2].code(context)
+    return self.apply(context, _list, [left, right])
+
+  def apply(self, context, _list : ListNode, values : list):
+    if len(values) != 2:
+      context.raise_eval_exception("Operator %s needs exactly 2 parameters. " % self.op_name)
+    left, right = values
+    if self.binary is not None:
+      left_type = type(left)
+      right_type = type(right)
+      if (left_type is float or left_type is int) and (right_type is float or right_type is int):
+        return self.binary(left, right)
     if not self.type_check(type(left), type(right)):
       context.raise_eval_exception("Operator %s got unexpected types: %s, %s" % (self.op_name, type(left), type(right)))
     return self.step(left, right)
@@ -99,19 +276,56 @@ class UnaryOp(Operator):
     raise NotImplementedError()
 
   def reduce(self, context, _list : ListNode):
-    if len(_list) != 2:
+    container = _list.container
+    if len(container) != 2:
+      context.raise_eval_exception("Operator %s needs exactly 1 parameters. " % self.op_name)
+    val = container[1].code(context)
+    if not self.type_check(type(val)):
+      context.raise_eval_exception("Operator %s got an unexpected type: %s" % (self.op_name, type(val)))
+    return self.step(val)
+
+  def apply(self, context, _list : ListNode, values : list):
+    if len(values) != 1:
       context.raise_eval_exception("Operator %s needs exactly 1 parameters. " % self.op_name)
-    val = context.evaluate(_list[1])
+    val = values[0]
     if not self.type_check(type(val)):
       context.raise_eval_exception("Operator %s got an unexpected type: %s" % (self.op_name, type(val)))
     return self.step(val)
 
+class Function(Operator):
+  """
+  A builtin taking `arity` evaluated arguments, or any number if it is None, which
+  `invoke` gets as a list.
+  """
+  arity = None
+
+  def invoke(self, context, _list : ListNode, values : list):
+    raise NotImplementedError()
+
+  def reduce(self, context, _list : ListNode):
+    return self.apply(context, _list, [node.code(context) for node in _list.container[1:]])
+
+  def apply(self, context, _list : ListNode, values : list):
+    if self.arity is not None and len(values) != self.arity:
+      context.raise_eval_exception("Operator %s needs exactly %d parameters. " % (self.op_name, self.arity))
+    return self.invoke(context, _list, values)
+
+  def check_sequence(self, context, value):
+    # A list, i.e. null or pairs ending with null, or a vector.
+    if type(value) is Pair:
+      if value.length is not None:
+        return value
+    elif type(value) is list or isinstance(value, Null):
+      return value
+    context.raise_eval_exception("Operator %s got an unexpected type: %s" % (self.op_name, type(value)))
+
 @built_in("+")
 class Add(Scannable):
+  binary = staticmethod(operator.add)
 
   @staticmethod
   def type_check(t):
-    return t == int or t == float
+    return t == int or t == float or t == Fraction
 
   @staticmethod
   def step(s, new):
@@ -124,10 +338,11 @@ class Add(Scannable):
 
 @built_in("*")
 class Multiply(Scannable):
+  binary = staticmethod(operator.mul)
 
   @staticmethod
   def type_check(t):
-    return t == int or t == float
+    return t == int or t == float or t == Fraction
 
   @staticmethod
   def step(s, new):
@@ -139,45 +354,68 @@ class Multiply(Scannable):
 
 @built_in("-")
 class Substract(BinaryOp):
+  binary = staticmethod(operator.sub)
 
   @staticmethod
   def type_check(t1, t2):
-    return (t1 == int or t1 == float) and (t2 == int or t2 == float)
+    return (t1 == int or t1 == float or t1 == Fraction) and (t2 == int or t2 == float or t2 == Fraction)
 
   @staticmethod
   def step(left, right):
     return left - right
 
+def _exact(value : Fraction):
+  # An exact result is kept as an int when it is one.
+  if value.denominator == 1:
+    return value.numerator
+  return value
+
+
+def _divide(left, right):
+  # Exact numbers are divided exactly.
+  if (type(left) is int or type(left) is Fraction) and (type(right) is int or type(right) is Fraction):
+    return _exact(Fraction(left) / right)
+  return left / right
+
+
+def _power(left, right):
+  # So is an exact number raised to a negative integer.
+  if type(right) is int and right < 0 and (type(left) is int or type(left) is Fraction):
+    return _exact(Fraction(left) ** right)
+  return left ** right
+
+
 @built_in("/")
 class Divide(BinaryOp):
+  binary = staticmethod(_divide)
 
   @staticmethod
   def type_check(t1, t2):
-    return (t1 == int or t1 == float) and (t2 == int or t2 == float)
+    return (t1 == int or t1 == float or t1 == Fraction) and (t2 == int or t2 == float or t2 == Fraction)
 
   @staticmethod
   def step(left, right):
-    return left / right
+    return _divide(left, right)
 
 @built_in("=")
 class Equal(BinaryOp):
+  binary = staticmethod(operator.eq)
 
   @staticmethod
   def type_check(t1, t2):
-    return ((t1 == int or t1 == float) and (t2 == int or t2 == float)) or (t1 == str and t2 == str) or (t1 == Null or t2 == Null) or (t1 == bool and t2 == bool)
+    return ((t1 == int or t1 == float or t1 == Fraction) and (t2 == int or t2 == float or t2 == Fraction)) or ((t1 == str or t1 == Rope) and (t2 == str or t2 == Rope)) or (t1 == Null or t2 == Null) or (t1 == bool and t2 == bool)
 
   @staticmethod
   def step(left, right):
-    print("left:", left)
-    print("right:", right)
     return left == right
 
 @built_in("<")
 class Less(BinaryOp):
+  binary = staticmethod(operator.lt)
 
   @staticmethod
   def type_check(t1, t2):
-    return ((t1 == int or t1 == float) and (t2 == int or t2 == float)) or (t1 == str and t2 == str)
+    return ((t1 == int or t1 == float or t1 == Fraction) and (t2 == int or t2 == float or t2 == Fraction)) or ((t1 == str or t1 == Rope) and (t2 == str or t2 == Rope))
 
   @staticmethod
   def step(left, right):
@@ -185,10 +423,11 @@ class Less(BinaryOp):
 
 @built_in(">")
 class Greater(BinaryOp):
+  binary = staticmethod(operator.gt)
 
   @staticmethod
   def type_check(t1, t2):
-    return ((t1 == int or t1 == float) and (t2 == int or t2 == float)) or (t1 == str and t2 == str)
+    return ((t1 == int or t1 == float or t1 == Fraction) and (t2 == int or t2 == float or t2 == Fraction)) or ((t1 == str or t1 == Rope) and (t2 == str or t2 == Rope))
 
   @staticmethod
   def step(left, right):
@@ -196,14 +435,15 @@ class Greater(BinaryOp):
 
 @built_in("expt")
 class Exponential(BinaryOp):
+  binary = staticmethod(_power)
 
   @staticmethod
   def type_check(t1, t2):
-    return (t1 == int or t1 == float) and (t2 == int or t2 == float)
+    return (t1 == int or t1 == float or t1 == Fraction) and (t2 == int or t2 == float or t2 == Fraction)
 
   @staticmethod
   def step(left, right):
-    return left ** right
+    return _power(left, right)
 
 @built_in(C.DEFINE)
 class Define(Operator):
@@ -223,24 +463,18 @@ class UserDefined(Entity):
     self.name = name
     self.node = node
 
-class UserAtom(UserDefined):
-
-  def __init__(self, *args, **kwargs):
-    super().__init__(*args, **kwargs)
-
-  def __str__(self):
-    return "<UserAtom %r at %x>" % (self.name, id(self))
-
-
 class UserFunc(UserDefined, Operator):
 
-  def __init__(self, captured : Dict[str, Entity], param_list : List, *args, **kwargs):
+  def __init__(self, param_list : List, scope, frame, *args, **kwargs):
     super().__init__(*args, **kwargs)
-    self.captured = captured
     self.param_list = param_list
+    # Layout of the frames of this function, and the frame it was defined in, which
+    # is the parent of each of them: free variables are looked up through it.
+    self.scope = scope
+    self.frame = frame
 
   def reduce(self, context, _list : ListNode):
-    return context.call(self.node, arg_list=_list, param_list=self.params, captured=self.captured)
+    return context.call(self, _list)
 
   def __str__(self):
     return "<UserFunc %r at %x>" % (self.name, id(self))
@@ -252,23 +486,26 @@ class UserFunc(UserDefined, Operator):
 
 @built_in(C.IF)
 class If(Operator):
-  def reduce(self, context, _list : ListNode):
+  def reduce(self, context, _list : ListNode, tail=False):
     """
     (if predicate
       consequent
       alternative)
+
+    The branches are in tail position if the `if` is.
     """
-    if len(_list) != 4:
+    container = _list.container
+    if len(container) != 4:
       context.raise_eval_exception("Operator %s needs exactly 3 parameters. " % self.op_name)
 
-    predicate = context.evaluate(_list[1])
+    predicate = container[1].code(context)
     if predicate not in [True, False]:
       context.raise_eval_exception("%s should be of type bool, got %s" % (_list[1], type(predicate)))
 
     if predicate:
-      return context.evaluate(_list[2])
+      return container[2].code(context, tail)
     else:
-      return context.evaluate(_list[3])
+      return container[3].code(context, tail)
 
 @built_in("cons")
 class Cons(BinaryOp):
@@ -278,38 +515,52 @@ class Cons(BinaryOp):
 
   @staticmethod
   def step(left, right):
-    return (left, right)
+    return Pair(left, right)
 
 @built_in("car")
 class Car(UnaryOp):
   @staticmethod
   def type_check(t):
-    return t == tuple
+    return t == Pair
 
   @staticmethod
   def step(val):
-    return val[0]
+    return val.car
 
 @built_in("cdr")
 class Cdr(UnaryOp):
   @staticmethod
   def type_check(t):
-    return t == tuple
+    return t == Pair
 
   @staticmethod
   def step(val):
-    return val[1]
+    return val.cdr
 
 @built_in("strcat")
 class Strcat(Scannable):
 
   @staticmethod
   def type_check(t):
-    return t == str
+    return t == str or t == Rope
 
   @staticmethod
   def step(s, new):
-    return s + new
+    if type(new) is Rope:
+      if not s:
+        # The first argument, which is usually the accumulator.
+        return new
+      if type(s) is str:
+        # The accumulator on the right.
+        return new.prepend(s)
+      if len(s) < len(new):
+        return new.prepend(str(s))
+      new = str(new)
+    if type(s) is Rope:
+      return s.concat(new)
+    if len(s) + len(new) < Rope.MIN_LENGTH:
+      return s + new
+    return Rope([s, new], len(s) + len(new))
 
   @staticmethod
   def begin():
@@ -319,7 +570,7 @@ class Strcat(Scannable):
 class Char(UnaryOp):
   @staticmethod
   def type_check(t):
-    return (t == int) or (t == float)
+    return (t == int) or (t == float) or (t == Fraction)
 
   @staticmethod
   def step(val):
@@ -338,8 +589,150 @@ class List(Scannable):
 
   @staticmethod
   def step(s, new):
-    return (new, s)
+    return Pair(new, s)
 
   @staticmethod
   def begin():
-    return Null()
\ No newline at end of file
+    return null
+
+@built_in("vector")
+class Vector(Function):
+  """
+  (vector items...): a vector, i.e. a Python list, of the items.
+  """
+  def invoke(self, context, _list : ListNode, values : list):
+    return values
+
+@built_in("length")
+class Length(Function):
+  arity = 1
+
+  def invoke(self, context, _list : ListNode, values : list):
+    seq = values[0]
+    if type(seq) is str or type(seq) is Rope:
+      length = len(seq)
+    else:
+      length = len(self.check_sequence(context, seq))
+    return length
+
+@built_in("nth")
+class Nth(Function):
+  """
+  (nth seq index), from 0.
+  """
+  arity = 2
+
+  def invoke(self, context, _list : ListNode, values : list):
+    seq, index = values
+    if type(index) not in (int, float, Fraction) or index != int(index):
+      context.raise_eval_exception("Operator %s got an unexpected index: %s" % (self.op_name, index))
+    index = int(index)
+    if type(seq) is Rope:
+      seq = str(seq)
+    if type(seq) is list or type(seq) is str:
+      if 0 <= index < len(seq):
+        return seq[index]
+    elif 0 <= index < len(self.check_sequence(context, seq)):
+      for _ in range(index):
+        seq = seq.cdr
+      return seq.car
+    context.raise_eval_exception("Index %d is out of range. " % index)
+
+@built_in("map")
+class Map(Function):
+  """
+  (map func seq): a sequence of the same kind holding `func` applied to each item.
+  """
+  arity = 2
+
+  def invoke(self, context, _list : ListNode, values : list):
+    func, seq = values
+    results = [context.apply(func, [value]) for value in self.check_sequence(context, seq)]
+    return results if type(seq) is list else make_list(results)
+
+@built_in("filter")
+class Filter(Function):
+  """
+  (filter predicate seq): a sequence of the same kind holding the items that satisfy
+  `predicate`.
+  """
+  arity = 2
+
+  def invoke(self, context, _list : ListNode, values : list):
+    predicate, seq = values
+    results = []
+    for value in self.check_sequence(context, seq):
+      keep = context.apply(predicate, [value])
+      if keep not in [True, False]:
+        context.raise_eval_exception("%s should return a bool, got %s" % (predicate, type(keep)))
+      if keep:
+        results.append(value)
+    return results if type(seq) is list else make_list(results)
+
+@built_in("fold")
+class Fold(Function):
+  """
+  (fold func init seq): `(func (func init item0) item1)`... over the items of `seq`.
+  """
+  arity = 3
+
+  def invoke(self, context, _list : ListNode, values : list):
+    func, acc, seq = values
+    for value in self.check_sequence(context, seq):
+      acc = context.apply(func, [acc, value])
+    return acc
+
+@built_in("append")
+class Append(Function):
+  """
+  (append seqs...): the items of all the lists, or of all the vectors, in order. The
+  last list is shared, not copied.
+  """
+
+  def invoke(self, context, _list : ListNode, values : list):
+    for seq in values:
+      self.check_sequence(context, seq)
+    if values and all(type(seq) is list for seq in values):
+      return [value for seq in values for value in seq]
+    if any(type(seq) is list for seq in values):
+      context.raise_eval_exception("Operator %s cannot append lists and vectors. " % self.op_name)
+    if not values:
+      return null
+    result = values[-1]
+    for seq in reversed(values[:-1]):
+      for value in reversed(list(seq)):
+        result = Pair(value, result)
+    return result
+
+def display_str(context, value) -> str:
+  """
+  `value` as written by `display` and `print`. Integers too long for `str` (see
+  `sys.set_int_max_str_digits`) are an error of the program, not of the host.
+  """
+  try:
+    return str(value)
+  except ValueError as e:
+    context.raise_eval_exception("Cannot display the value: %s" % e)
+
+@built_in("display")
+class Display(Function):
+  """
+  (display value): writes `value` to the output of the context, a string without
+  quotes, and returns null.
+  """
+  arity = 1
+
+  def invoke(self, context, _list : ListNode, values : list):
+    context.output.write(display_str(context, values[0]))
+    return null
+
+@built_in("print")
+class Print(Function):
+  """
+  (print values...): writes the values to the output of the context, separated by
+  spaces, and a newline, and returns null.
+  """
+
+  def invoke(self, context, _list : ListNode, values : list):
+    context.output.write(" ".join(display_str(context, value) for value in values) + "\n")
+    return null
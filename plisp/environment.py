@@ -0,0 +1,67 @@
+from typing import *
+
+# The value of a slot whose name is not bound yet: None is a value like any other.
+UNBOUND = object()
+
+
+class Scope:
+  """
+  Compile-time layout of a frame: the names bound by a function (parameters,
+  local defines and captured variables) or by a `define` block, each mapped to a
+  slot index.
+  """
+
+  def __init__(self, names : Iterable[str] = (), parent : Optional['Scope'] = None):
+    self.parent = parent
+    self.names : Dict[str, int] = {}
+    for name in names:
+      self.add(name)
+
+  def __len__(self):
+    return len(self.names)
+
+  def add(self, name : str) -> int:
+    index = self.names.get(name)
+    if index is None:
+      index = self.names[name] = len(self.names)
+    return index
+
+  def resolve(self, name : str) -> Optional[Tuple[int, int]]:
+    """
+    Returns the (frame depth, slot index) of `name`, or None if it is not bound by
+    any enclosing scope.
+    """
+    depth = 0
+    scope = self
+    while scope is not None:
+      index = scope.names.get(name)
+      if index is not None:
+        return depth, index
+      scope = scope.parent
+      depth += 1
+    return None
+
+
+class Frame:
+  __slots__ = ("slots", "parent", "scope")
+
+  def __init__(self, slots : list, parent : Optional['Frame'], scope : Scope):
+    self.slots = slots
+    self.parent = parent
+    self.scope = scope
+
+  def get(self, name : str):
+    """
+    The value of `name` in this frame, or UNBOUND.
+    """
+    index = self.scope.names.get(name)
+    if index is None or index >= len(self.slots):
+      return UNBOUND
+    return self.slots[index]
+
+  def set(self, name : str, value):
+    index = self.scope.add(name)
+    slots = self.slots
+    if index >= len(slots):
+      slots.extend([UNBOUND] * (index + 1 - len(slots)))
+    slots[index] = value
@@ -1,13 +1,30 @@
 from plisp import ast
-from plisp.entity import Entity, built_in_namespace, UserDefined, UserFunc, If
+from plisp.entity import Entity, built_in_namespace, UserDefined, UserFunc, Rope
+from plisp.compiler import TailCall, compile_node
+from plisp.environment import Scope, Frame, UNBOUND
+from plisp.optimize import fold_constants
+from plisp.profiler import Profiler
+from plisp.output import OutputSink, TRACE
+from plisp.cache import ProgramCache
+from plisp import machine
 from typing import *
+from concurrent.futures import Future, wait, TimeoutError as FutureTimeoutError
 import plisp.constants as C
+import asyncio
+import io
+import queue
 import threading
 
 class AtomicSignal():
+  """
+  Signal sent to a running evaluation, e.g. "kill". Reads and writes of a plain
+  attribute are atomic, so the evaluation polls `killed` without taking the lock;
+  the lock only orders concurrent writers.
+  """
+
   def __init__(self, value=""):
-    self._value = value
     self._lock = threading.Lock()
+    self.value = value
 
   @property
   def lock(self):
@@ -15,14 +32,13 @@ class AtomicSignal():
 
   @property
   def value(self):
-    with self._lock:
-      return self._value
+    return self._value
 
   @value.setter
   def value(self, v):
     with self._lock:
       self._value = v
-      return self._value
+      self.killed = v == "kill"
 
 class EvalException(ValueError):
 
@@ -35,36 +51,59 @@ class EvalException(ValueError):
     super().__init__(*args)
 
   def track_back2str(self):
+    lines = (self.context.code or "").split('\n') if self.context else []
+
     def display_stack(x : Entity):
       if isinstance(x, UserDefined):
-        return "  line %d, in %s\n    %s" % (x.node.position.row, x, self.context.code.split('\n')[x.node.position.row - 1])
+        row = x.node.position.row
+        return "  line %d, in %s\n    %s" % (row, x, lines[row - 1] if row <= len(lines) else "")
       else:
         return "  %s" % x
     return 'Plisp Traceback: \n' +  '\n'.join([display_stack(x) for x in self.plisp_trace_back])
 
-class TailRecursiveSignal:
+def _host_value(value):
+  # Strings built by `strcat` are joined when they are handed back to the caller.
+  return str(value) if type(value) is Rope else value
 
-  def __init__(self, node : ast.Node):
-    self.node = node
 
 class Context:
 
-  def __init__(self, code, signal : AtomicSignal, append_namespace : bool = False):
+  def __init__(self, code, signal : AtomicSignal, append_namespace : bool = False, exact : bool = True,
+               output : Optional[OutputSink] = None):
     self.code = code
+    # Where `display` and `print` write, and trace messages go.
+    self.output = output if output is not None else OutputSink()
+    # Whether the source parsed by the context reads numbers exactly, see
+    # `ast.classify_atom`. Parsed nodes carry their numbers already.
+    self.exact = exact
     self.namespace_stack = [built_in_namespace]
     self.stack_trace = []
+    self.frame : Optional[Frame] = None
+    # Literal names such as `1.0` bound by a global define, and names of builtins
+    # bound again in a namespace.
+    self.shadowed_literals = set()
+    self.shadowed_builtins = set()
+    self.parser : Optional[ast.Parser] = None
     if append_namespace:
       self.push_np()
     self.signal = signal
 
   def check_signal(self):
-    if self.signal.value == "kill":
+    # Polled at user function calls and tail-call iterations only: every unbounded
+    # evaluation goes through one of them, and nodes in between stay free of it.
+    if self.signal.killed:
       self.raise_eval_exception("killed")
 
   @property
   def current_namespace(self):
     return self.namespace_stack[-1]
 
+  @property
+  def scope(self) -> Optional[Scope]:
+    if self.frame is None:
+      return None
+    return self.frame.scope
+
   def push_stack_trace(self, e):
     self.stack_trace.append(e)
 
@@ -73,6 +112,7 @@ class Context:
 
   def push_np(self, d=None):
     if d:
+      self.shadowed_builtins.update(name for name in d if name in built_in_namespace)
       self.namespace_stack.append(d)
     else:
       self.namespace_stack.append({})
@@ -80,88 +120,72 @@ class Context:
   def pop_np(self):
     return self.namespace_stack.pop()
 
-  @staticmethod
-  def from_str(atom):
-    string = atom.name
+  def bind(self, name, value):
+    if self.frame is None:
+      if name in built_in_namespace:
+        self.shadowed_builtins.add(name)
+      self.current_namespace[name] = value
+    else:
+      self.frame.set(name, value)
+
+  def compile(self, node : ast.Node):
+    return compile_node(node, self.scope)
+
+  def evaluate_list(self, node_list : List[ast.Node], stackless=False, profiler : Optional[Profiler] = None):
+    """
+    With `stackless`, the nodes are evaluated by `machine.run`, whose recursion depth
+    is not bounded by the Python stack. With `profiler`, the calls they make are
+    recorded in it. The output left in a sink with a stream is flushed at the end.
+    """
+    if profiler is not None:
+      profiler.attach(self)
     try:
-      if atom.str_value:
-        return atom.name
-      elif string == "True":
-        return True
-      elif string == "False":
-        return False
-      else:
-        return float(string)
-    except:
-      return None
-
-  @staticmethod
-  def is_literal(atom):
-    return Context.from_str(atom) != None
-
-  def lookup(self, atom):
-    for np in reversed(self.namespace_stack):
-      if atom.name in np:
-        return np[atom.name]
-    return None
-
-  def evaluate_list(self, node_list : List[ast.Node]):
-    return [self.evaluate(node) for node in node_list]
+      results = []
+      for node in node_list:
+        self.check_signal()
+        if stackless:
+          results.append(_host_value(machine.run(self, node)))
+        else:
+          results.append(_host_value(self.evaluate(node)))
+      return results
+    finally:
+      if profiler is not None:
+        profiler.detach(self)
+      self.output.flush()
+
+  def evaluate_stream(self, chunks : Iterable[str]) -> Iterator[Any]:
+    """
+    Parses `chunks` (e.g. a file object, or any iterable of source text) incrementally
+    and yields the value of each top-level form as soon as it is complete, without
+    keeping the source or the parsed forms around.
+    """
+    parser = ast.Parser(self.exact)
+    for chunk in chunks:
+      for node in parser.feed(chunk):
+        yield _host_value(self.evaluate(node))
+    for node in parser.close():
+      yield _host_value(self.evaluate(node))
+
+  def feed(self, chunk : str) -> List[Any]:
+    """
+    Continues the input of an interactive session with `chunk`, e.g. a line, and
+    returns the values of the top-level forms it completes. The fed source is kept
+    in `code` for tracebacks.
+    """
+    if self.parser is None:
+      self.parser = ast.Parser(self.exact)
+      self.code = ""
+    self.code += chunk
+    return [_host_value(self.evaluate(node)) for node in self.parser.feed(chunk)]
 
   def raise_eval_exception(self, message):
     e = EvalException(message, plisp_trace_back=self.stack_trace.copy(), context=self)
     raise e
 
-  @staticmethod
-  def level_lookup(name, *funcs):
-    for func in funcs:
-      r = func(name)
-      if r is not None:
-        return r
-    return None
-
-  def atom_lookup(self, atom):
-    if atom.str_value:
-      return atom.name
-    return self.level_lookup(atom, self.lookup, self.from_str)
-
-  def is_tail_recursive(self, operator : Entity):
-    if len(self.stack_trace) > 0 and self.stack_trace[-1] is operator:
-      return True
-    elif len(self.stack_trace) > 1 and isinstance(self.stack_trace[-1], If) and self.stack_trace[-2] is operator:
-      return True
-
-    return False
-
-  def evaluate(self, node : ast.Node, allow_tail_recursive=True):
-    self.check_signal()
-
-    if isinstance(node, ast.AtomNode):
-      lookup = self.atom_lookup(node)
-      if lookup is None:
-        self.raise_eval_exception("Unknown literal '%s'. " % node)
-      return lookup
-    elif isinstance(node, ast.ListNode):
-      if isinstance(node[0], ast.ListNode):
-        operator = self.evaluate(node[0])
-      else:
-        operator = self.lookup(node[0])
-      if operator is None:
-        self.raise_eval_exception("Unknown literal '%s'. " % node[0])
-
-      if not isinstance(operator, Entity):
-        operator = Entity(operator)
-
-      if allow_tail_recursive and self.is_tail_recursive(operator) and isinstance(operator, UserFunc):
-        return TailRecursiveSignal(node)
-      else:
-        try:
-          self.push_stack_trace(operator)
-          return operator.reduce(self, node)
-        finally:
-          self.pop_stack_trace()
-    else:
+  def evaluate(self, node : ast.Node):
+    if not isinstance(node, ast.Node):
       self.raise_eval_exception("Unexpected type: %s of node" % type(node))
+    return node.code(self)
 
   def check_len(self, node, min_len=0, max_len=2**31, exact_len=-1):
     if exact_len != -1:
@@ -174,15 +198,13 @@ class Context:
     first_node = node[1]
     self.check_len(node, min_len=3)
     if isinstance(first_node, ast.AtomNode):
-      entity = self.call(node)
-      self.current_namespace[first_node.name] = entity
+      entity = self.block(node)
+      if first_node.value is not None and self.frame is None:
+        self.shadowed_literals.add(first_node.name)
+      self.bind(first_node.name, entity)
     elif isinstance(first_node, ast.ListNode):
-      #print("defining function%s" % node[1])
-      entity = UserFunc(name=node[1][0].name, node=node, captured=self.capture(node), param_list=[x for x in first_node[1:]])
-      #print(node[1][0].name + " is defined to be %s" % entity)
-      #print("closure of %s is %s" % (node[1][0].name, entity.captured))
-      #print(node)
-      self.current_namespace[entity.name] = entity
+      entity = self.make_func(node[1][0].name, node, [x for x in first_node[1:]])
+      self.bind(entity.name, entity)
 
   def lambda_(self, node : ast.ListNode):
     first_node = node[1]
@@ -190,12 +212,53 @@ class Context:
     if isinstance(first_node, ast.AtomNode):
       self.raise_eval_exception("The second parameter of 'lambda' should be a list. ")
     elif isinstance(first_node, ast.ListNode):
-      entity = UserFunc(name="__lambda", node=node, captured=self.capture(node), param_list=[x for x in first_node])
-      return entity
+      return self.make_func("__lambda", node, [x for x in first_node])
+
+  def make_func(self, name, node : ast.ListNode, param_list : List[ast.AtomNode]) -> UserFunc:
+    """
+    Creates the function defined by `node` in the current frame. Its frames hold the
+    parameters first, then the local defines; free variables are looked up through
+    the frame the function is defined in, so nothing is copied. They are bound late:
+    a call sees their values at the time of the call, and a name defined after the
+    function, such as a mutually recursive one, can be used by it.
+    """
+    if self.output.enabled(TRACE):
+      self.output.trace("function %s at %s, free variables: %s" % (name, node.position, ", ".join(self.free_names(node))))
+    scope = node.body_scope
+    if scope is None:
+      # The layout only depends on the node, so all the functions it creates share it.
+      names = [x.name for x in param_list] + self.local_names(node[2:])
+      scope = node.body_scope = Scope(names, parent=self.scope)
+    return UserFunc(name=name, node=node, param_list=param_list, scope=scope, frame=self.frame)
 
-  def capture(self, func_node : Union[ast.AtomNode, ast.ListNode], root_bound_names=None):
-    captured = {}
+  @staticmethod
+  def local_names(body : List[ast.Node]) -> List[str]:
+    names = []
+    for n in Context.iter_node(body):
+      if isinstance(n, ast.ListNode) and n[0].name == C.DEFINE:
+        if isinstance(n[1], ast.AtomNode):
+          names.append(n[1].name)
+        elif isinstance(n[1], ast.ListNode) and len(n[1]) > 0:
+          names.append(n[1][0].name)
+    return names
+
+  @staticmethod
+  def free_names(func_node : ast.ListNode) -> Tuple[str, ...]:
+    """
+    The names of the free variables of the function defined by `func_node`, once
+    each, in the order they first appear; computed once per node.
+    """
+    names = func_node.free_names
+    if names is None:
+      names = func_node.free_names = tuple(dict.fromkeys(atom.name for atom in Context.free_atoms(func_node)))
+    return names
 
+  @staticmethod
+  def free_atoms(func_node : ast.ListNode, root_bound_names=None) -> List[ast.AtomNode]:
+    """
+    The symbols of the body of `func_node`, nested functions included, that are
+    neither bound by it nor builtins, in the order they appear.
+    """
     if isinstance(func_node[1], ast.ListNode):
       bound_names = set(map(lambda x : x.name, func_node[1]))
     else:
@@ -204,30 +267,21 @@ class Context:
       root_bound_names = set()
     root_bound_names.update(bound_names)
 
-    def is_free(atom):
-      not_bounded = atom.name not in root_bound_names and atom.name not in built_in_namespace
-      can_lookup = not (self.atom_lookup(atom) is None)
-      if not_bounded and not can_lookup:
-        self.raise_eval_exception("'%s' is used before defined. " % atom)
-      return not_bounded and can_lookup and not self.is_literal(atom)
-
+    free_atoms = []
     # node: (define (...) (define ...) (define ...) () )
-    for n in self.iter_node(func_node[2:]):
+    for n in Context.iter_node(func_node[2:]):
       if isinstance(n, ast.AtomNode):
-        if is_free(n):
-          captured[n.name] = self.atom_lookup(n)
+        if n.kind == ast.SYMBOL and n.name not in root_bound_names and n.name not in built_in_namespace:
+          free_atoms.append(n)
       elif n[0].name == C.DEFINE and isinstance(n[1], ast.AtomNode):
         root_bound_names.add(n[1].name)
-        captured.update(self.capture(n, root_bound_names.copy()))
+        free_atoms += Context.free_atoms(n, root_bound_names.copy())
       elif n[0].name == C.DEFINE and isinstance(n[1], ast.ListNode):
         root_bound_names.add(n[1][0].name)
-        captured.update(self.capture(n, root_bound_names.copy()))
+        free_atoms += Context.free_atoms(n, root_bound_names.copy())
       elif n[0].name == C.LAMBDA:
-        captured.update(self.capture(n, root_bound_names.copy()))
-
-    print("captured:", captured)
-
-    return captured
+        free_atoms += Context.free_atoms(n, root_bound_names.copy())
+    return free_atoms
 
   @staticmethod
   def iter_node(list_node : ast.ListNode):
@@ -240,95 +294,307 @@ class Context:
         for _node in Context.iter_node(node):
           yield _node
 
-  def call(self, node : ast.ListNode,
-           arg_list : ast.ListNode = None,
-           param_list : List[ast.AtomNode] = None,
-           captured : Dict[str, Any] = None):
-    param_namespace = {}
-    if arg_list:
-      if len(arg_list) - 1 != len(param_list):
-        self.raise_eval_exception("Length of arguments and parameters are mismatched for user function %s: %d vs. %d " %
-                                  (node[1][0].name, len(arg_list) - 1, len(param_list)))
-      for i in range(1, len(arg_list)):
-        param_name = param_list[i - 1].name
-        value = self.evaluate(arg_list[i], allow_tail_recursive=False)
-        param_namespace[param_name] = value
-      self.push_np(param_namespace)
-
-    while True:  # For tail-recursive function
-      if captured:
-        self.push_np(captured.copy())
-      else:
-        self.push_np()
-      try:
-        tail_recursive = False
-        result = None
+  def block(self, node : ast.ListNode):
+    """
+    Evaluates the body of `(define name body...)` in a frame of its own and returns
+    its first non-None value.
+    """
+    scope = self.block_scope(node)
+    frame = Frame([UNBOUND] * len(scope), self.frame, scope)
+    body = node.container
+    saved_frame = self.frame
+    self.frame = frame
+    try:
+      for i in range(2, len(body)):
+        result = body[i].code(self)
+        if result is not None:
+          return result
+      self.raise_eval_exception("Definition of %s should contain one body. " % node[1].name)
+    finally:
+      self.frame = saved_frame
+
+  def block_scope(self, node : ast.ListNode) -> Scope:
+    """
+    The layout of the frames of the block `(define name body...)`, built once per node.
+    """
+    scope = node.body_scope
+    if scope is None:
+      scope = node.body_scope = Scope(self.local_names(node[2:]), parent=self.scope)
+    return scope
+
+  def bind_args(self, func : UserFunc, args : List[ast.Node]) -> list:
+    """
+    Evaluates the arguments of `(func args...)` into the slots of a new frame of `func`.
+    """
+    param_count = len(func.param_list)
+    if len(args) - 1 != param_count:
+      self.raise_eval_exception("Length of arguments and parameters are mismatched for user function %s: %d vs. %d " %
+                                (func.name, len(args) - 1, param_count))
+    slots = [UNBOUND] * len(func.scope)
+    for i in range(1, len(args)):
+      slots[i - 1] = args[i].code(self)
+    return slots
+
+  def call(self, func : UserFunc, arg_list : ast.ListNode):
+    """
+    Calls `func` and, as a trampoline, every function it tail-calls in turn, all in
+    constant Python stack.
+    """
+    if self.signal.killed:
+      self.raise_eval_exception("killed")
+    return self.enter(func, self.bind_args(func, arg_list.container))
+
+  def enter(self, func : UserFunc, slots : list):
+    """
+    Runs `func` in a new frame holding `slots`; `func` must be on top of the trace.
+    """
+    signal = self.signal
+    stack_trace = self.stack_trace
+    saved_frame = self.frame
+    try:
+      while True:
+        self.frame = Frame(slots, func.frame, func.scope)
+        body = func.node.container
         # node: (define (...) (define ...) (define ...) () )
-        for i in range(2, len(node)):
-          result = self.evaluate(node[i])
+        for i in range(2, len(body)):
+          result = body[i].code(self, True)
           # Search non-define
           if result is not None:
-            if isinstance(result, TailRecursiveSignal):
-              #print("tail_recursive")
-              tail_recursive = True
-              arg_list = result.node
-              updates = {}
-              for i in range(1, len(arg_list)):
-                param_name = param_list[i - 1].name
-                value = self.evaluate(arg_list[i])
-                updates[param_name] = value
-              param_namespace.update(updates)
-              break
-            else:
-              return result
-
-        if tail_recursive:
-          continue
-        self.raise_eval_exception("User function %s should contain one body. " % node[1][0].name) # Not good!
-      finally:
-        self.pop_np()
-        if captured:
-          self.pop_np()
-
+            break
+        else:
+          self.raise_eval_exception("User function %s should contain one body. " % func.name) # Not good!
+
+        if type(result) is not TailCall:
+          return result
+        if signal.killed:
+          self.raise_eval_exception("killed")
+        func = result.func
+        slots = result.slots
+        stack_trace[-1] = func
+    finally:
+      self.frame = saved_frame
+
+  def apply(self, func : Entity, values : list):
+    """
+    Calls `func`, a user function or a builtin taking evaluated arguments, with
+    `values`. No node holds these values, so a builtin gets None as its node.
+    """
+    if isinstance(func, UserFunc):
+      if len(values) != len(func.param_list):
+        self.raise_eval_exception("Length of arguments and parameters are mismatched for user function %s: %d vs. %d " %
+                                  (func.name, len(values), len(func.param_list)))
+      if self.signal.killed:
+        self.raise_eval_exception("killed")
+      slots = [UNBOUND] * len(func.scope)
+      slots[:len(values)] = values
+    elif not hasattr(func, "apply"):
+      self.raise_eval_exception("%s cannot be applied. " % (func,))
+    self.stack_trace.append(func)
+    try:
+      if isinstance(func, UserFunc):
+        return self.enter(func, slots)
+      return func.apply(self, None, values)
+    finally:
+      self.stack_trace.pop()
 
   def add_to_namespace(self, name, Entity):
-    self.namespace_stack[-1][name] = Entity
+    self.bind(ast.symbol(name), Entity)
 
 
-def evaluate_list(code, node_list : List[ast.Node], timeout=10, append_namespace=False):
-
-  signal = AtomicSignal()
-  context = Context(code, signal, append_namespace=append_namespace)
-
-  import time
+class WorkerPool:
+  """
+  Daemon threads that run evaluations. Threads are started on demand, up to
+  `max_workers`, and reused by later submissions. The evaluation of a future
+  passed to `abandon`, e.g. killed at its timeout, no longer counts toward
+  `max_workers`: a thread stuck in it because it ignores its kill signal does not
+  take a place from the others.
+  """
 
-  class MyThread(threading.Thread):
-    def __init__(self, func, args=()):
-      super(MyThread, self).__init__()
-      self.func = func
-      self.args = args
-      self.exception = None
+  def __init__(self, max_workers : int = 32):
+    self.max_workers = max_workers
+    self._tasks = queue.SimpleQueue()
+    self._lock = threading.Lock()
+    self._threads : List[threading.Thread] = []
+    # Threads waiting for a task, tasks not taken yet, and the futures being run
+    # that were abandoned.
+    self._idle = 0
+    self._pending = 0
+    self._running : Dict[Future, threading.Thread] = {}
+    self._abandoned : Set[Future] = set()
+
+  def _live(self) -> int:
+    return len(self._threads) - len(self._abandoned)
+
+  def submit(self, func : Callable, *args) -> Future:
+    future = Future()
+    with self._lock:
+      self._pending += 1
+      if self._pending > self._idle and self._live() < self.max_workers:
+        thread = threading.Thread(target=self._work, name="plisp-worker-%d" % len(self._threads), daemon=True)
+        self._threads.append(thread)
+        thread.start()
+    self._tasks.put((future, func, args))
+    return future
+
+  def abandon(self, future : Future):
+    with self._lock:
+      if future in self._running:
+        self._abandoned.add(future)
 
-    def run(self):
-      try:
-        self.result = self.func(*self.args)
-      except Exception as e:
-        self.exception = e
+  def _work(self):
+    thread = threading.current_thread()
+    with self._lock:
+      self._idle += 1
+    while True:
+      future, func, args = self._tasks.get()
+      with self._lock:
+        self._idle -= 1
+        self._pending -= 1
+        self._running[future] = thread
+      result = error = None
+      run = future.set_running_or_notify_cancel()
+      if run:
+        try:
+          result = func(*args)
+        except BaseException as e:
+          error = e
+      with self._lock:
+        del self._running[future]
+        leaving = False
+        if future in self._abandoned:
+          self._abandoned.discard(future)
+          # Replaced while it was stuck: it leaves if it is one too many.
+          leaving = self._live() > self.max_workers
+        if leaving:
+          self._threads.remove(thread)
+        else:
+          # Idle before the caller gets the result, so that its next job does not
+          # start another thread.
+          self._idle += 1
+      if error is not None:
+        future.set_exception(error)
+      elif run:
+        future.set_result(result)
+      future = result = error = None
+      if leaving:
+        return
+
+
+_default_pool : Optional[WorkerPool] = None
+_default_pool_lock = threading.Lock()
+
+
+def default_pool() -> WorkerPool:
+  global _default_pool
+  with _default_pool_lock:
+    if _default_pool is None:
+      _default_pool = WorkerPool()
+    return _default_pool
+
+
+class Session:
+  """
+  A persistent evaluation context: definitions made by one call stay visible to the
+  following ones. Every call runs on a pooled worker thread and is killed after
+  `timeout` seconds. With a `cache`, `evaluate` does not parse a source it has seen
+  already.
+  """
+
+  def __init__(self, code="", timeout=10, append_namespace=True, pool : WorkerPool = None, exact=True,
+               output : Optional[OutputSink] = None, cache : Optional[ProgramCache] = None):
+    self.timeout = timeout
+    self.cache = cache
+    self.append_namespace = append_namespace
+    self.exact = exact
+    self.output = output if output is not None else OutputSink()
+    self.pool = pool or default_pool()
+    self.signal = AtomicSignal()
+    self.context = Context(code, self.signal, append_namespace=append_namespace, exact=exact, output=self.output)
+    self._future : Optional[Future] = None
+    self._lock = threading.Lock()
 
-    def get_result(self):
+  def reset(self):
+    """
+    Drops every definition made in this session.
+    """
+    with self._lock:
+      self._wait_idle(self.timeout)
+      self.context = Context("", self.signal, append_namespace=self.append_namespace, exact=self.exact, output=self.output)
+
+  def _wait_idle(self, timeout):
+    # A killed evaluation may still be unwinding on its worker; the context must not
+    # be shared with the next one.
+    if self._future is not None:
+      wait([self._future], timeout)
+      if not self._future.done():
+        raise EvalException("Session is still busy with a killed evaluation. ")
+
+  def evaluate(self, code : str, timeout=None, stackless=False, optimize=False, profiler : Optional[Profiler] = None) -> List[Any]:
+    if self.cache is not None and not optimize:
+      node_list = self.cache.parse(code, self.exact)
+    else:
+      node_list = ast.parse(io.StringIO(code), self.exact)
+    return self.evaluate_list(code, node_list, timeout=timeout, stackless=stackless, optimize=optimize, profiler=profiler)
+
+  def evaluate_list(self, code, node_list : List[ast.Node], timeout=None, stackless=False, optimize=False,
+                    profiler : Optional[Profiler] = None) -> List[Any]:
+    """
+    With `optimize`, `node_list` is first folded by `fold_constants`, in place. See
+    `Context.evaluate_list` for `stackless` and `profiler`.
+    """
+    if timeout is None:
+      timeout = self.timeout
+    with self._lock:
+      self._wait_idle(timeout)
+      if optimize:
+        shadowed = set()
+        for np in self.context.namespace_stack[1:]:
+          shadowed.update(np)
+        node_list = fold_constants(node_list, shadowed)
+      self.signal.value = ""
+      self.context.code = code
+      future = self._future = self.pool.submit(self.context.evaluate_list, node_list, stackless, profiler)
       try:
-        return self.result
-      except Exception:
-        return None
-
-  worker = MyThread(func=context.evaluate_list, args=(node_list,))
-  worker.start()
-  worker.join(timeout)
-
-  if worker.isAlive():
-    signal.value = "kill"
+        return future.result(timeout)
+      except FutureTimeoutError:
+        if not future.cancel():
+          self.signal.value = "kill"
+          self.pool.abandon(future)
+        raise EvalException("Evaluation timeout! ")
+
+
+def evaluate_list(code, node_list : List[ast.Node], timeout=10, append_namespace=True, stackless=False, optimize=False,
+                  profiler : Optional[Profiler] = None, output : Optional[OutputSink] = None):
+  session = Session(code, timeout=timeout, append_namespace=append_namespace, output=output)
+  return session.evaluate_list(code, node_list, stackless=stackless, optimize=optimize, profiler=profiler)
+
+
+async def evaluate_async(code, node_list : Optional[List[ast.Node]] = None, timeout=10, append_namespace=True,
+                         pool : WorkerPool = None, exact=True, output : Optional[OutputSink] = None,
+                         cache : Optional[ProgramCache] = None) -> List[Any]:
+  """
+  Asyncio counterpart of `evaluate_list`: the evaluation runs on a pooled worker
+  thread while the caller awaits it, and cancelling the awaiting task kills it. The
+  code is parsed on the worker when `node_list` is not given, through `cache` if
+  any.
+  """
+  signal = AtomicSignal()
+  context = Context(code, signal, append_namespace=append_namespace, exact=exact, output=output)
+
+  def run():
+    if node_list is not None:
+      return context.evaluate_list(node_list)
+    if cache is not None:
+      return context.evaluate_list(cache.parse(code, exact))
+    return context.evaluate_list(ast.parse(io.StringIO(code), exact))
+
+  pool = pool or default_pool()
+  future = pool.submit(run)
+  try:
+    return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+  except asyncio.TimeoutError:
     raise EvalException("Evaluation timeout! ")
-  else:
-    if worker.exception:
-      raise worker.exception
-    return worker.get_result()
\ No newline at end of file
+  finally:
+    if not future.done() and not future.cancel():
+      signal.value = "kill"
+      pool.abandon(future)
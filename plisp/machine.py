@@ -0,0 +1,288 @@
+from plisp import ast
+from plisp.compiler import compile_head
+from plisp.entity import Entity, UserFunc, If, Define, Scannable, BinaryOp, UnaryOp, Function
+from plisp.environment import Frame, UNBOUND
+from typing import *
+
+# Continuations, kept as tuples whose first item is one of these tags:
+HEAD = 0     # (HEAD, node, tail): the operator of `node` is being evaluated.
+ARGS = 1     # (ARGS, operator, node, values, tail): the arguments of `node` are.
+IF = 2       # (IF, node, tail): the predicate of an `if` is.
+BODY = 3     # (BODY, func, index): a form of the body of `func` is.
+RETURN = 4   # (RETURN, frame, trace_length): restores the caller of a function or block.
+UNTRACE = 5  # (UNTRACE,): pops the `if` whose branch is being evaluated off the trace.
+BLOCK = 6    # (BLOCK, node, index): a form of the body of `(define name body...)` is.
+BIND = 7     # (BIND, atom): binds the value of a `define` block to `atom`.
+
+_UNTRACE = (UNTRACE,)
+
+# How the machine applies an operator, by the type of the operator:
+CALL = 8     # A user function.
+STRICT = 9   # A builtin taking evaluated arguments, through its `apply`.
+BRANCH = 10  # `if`.
+DEFINE = 11  # `define`, whose blocks run on the machine.
+OTHER = 12   # Anything else, reduced by its compiled code.
+
+_KINDS : Dict[type, int] = {}
+
+
+def _kind_of(operator : Entity) -> int:
+  if isinstance(operator, UserFunc):
+    kind = CALL
+  elif isinstance(operator, If):
+    kind = BRANCH
+  elif isinstance(operator, (Scannable, BinaryOp, UnaryOp, Function)):
+    kind = STRICT
+  elif isinstance(operator, Define):
+    kind = DEFINE
+  else:
+    kind = OTHER
+  _KINDS[operator.__class__] = kind
+  return kind
+
+
+_NOT_LEAF = object()
+
+
+def _leaf(context, node : ast.Node):
+  """
+  Evaluates `node` if it is an atom, or a builtin applied to atoms only, which need
+  no continuation; returns _NOT_LEAF otherwise.
+  """
+  if node.__class__ is ast.AtomNode:
+    return node.code(context)
+  container = node.container
+  if not container:
+    return _NOT_LEAF
+  for argument in container:
+    if argument.__class__ is not ast.AtomNode:
+      return _NOT_LEAF
+  operator = container[0].code(context)
+  if _KINDS.get(operator.__class__) != STRICT:
+    return _NOT_LEAF
+  stack_trace = context.stack_trace
+  stack_trace.append(operator)
+  value = operator.apply(context, node, [argument.code(context) for argument in container[1:]])
+  stack_trace.pop()
+  return value
+
+
+def run(context, node : ast.Node):
+  """
+  Evaluates `node` like `node.code(context)`, but keeps the evaluations in progress
+  as continuations on a list instead of Python frames, so that the depth of
+  non-tail recursion is only limited by memory. User functions, `if`, `define`
+  blocks and the arithmetic and list builtins run on it; other operators are reduced
+  by their compiled code.
+  """
+  conts = []
+  stack_trace = context.stack_trace
+  signal = context.signal
+  entry_frame = context.frame
+  entry_trace = len(stack_trace)
+
+  tail = False      # Whether `node` is in tail position of a user function.
+  operator = None   # Set when `node` is to be applied to it.
+  func = None       # Set when a frame of it with `slots` is to be entered.
+  slots = None
+  value = None
+  try:
+    while True:
+      if func is not None:
+        if tail:
+          # Drops the continuations of the function being left: they would only
+          # pass its value through.
+          while conts[-1][0] != RETURN:
+            conts.pop()
+          del stack_trace[conts[-1][2] + 1:]
+          stack_trace[-1] = func
+        else:
+          conts.append((RETURN, context.frame, len(stack_trace) - 1))
+        context.frame = Frame(slots, func.frame, func.scope)
+        body = func.node.container
+        if len(body) < 3:
+          context.raise_eval_exception("User function %s should contain one body. " % func.name)
+        conts.append((BODY, func, 2))
+        node = body[2]
+        tail = True
+        func = None
+        continue
+
+      if operator is None:
+        if isinstance(node, ast.AtomNode):
+          value = node.code(context)
+          node = None
+        else:
+          container = node.container
+          if not container:
+            context.raise_eval_exception("Cannot evaluate an empty list. ")
+          head = container[0]
+          if isinstance(head, ast.ListNode):
+            conts.append((HEAD, node, tail))
+            node = head
+            tail = False
+            continue
+          if head.value is None:
+            operator = head.code(context)
+          else:
+            operator = compile_head(head, context.scope)(context)
+            if operator is None:
+              context.raise_eval_exception("Unknown literal '%s'. " % head)
+
+      if operator is not None:
+        if not isinstance(operator, Entity):
+          operator = Entity(operator)
+        stack_trace.append(operator)
+        container = node.container
+        kind = _KINDS.get(operator.__class__)
+        if kind is None:
+          kind = _kind_of(operator)
+
+        if kind == CALL or kind == STRICT:
+          if kind == CALL:
+            if signal.killed:
+              context.raise_eval_exception("killed")
+            if len(container) - 1 != len(operator.param_list):
+              context.raise_eval_exception("Length of arguments and parameters are mismatched for user function %s: %d vs. %d " %
+                                           (operator.name, len(container) - 1, len(operator.param_list)))
+          # Leaves are evaluated right away, only other lists need a trip through the loop.
+          values = []
+          index = 1
+          while index < len(container):
+            argument = _leaf(context, container[index])
+            if argument is _NOT_LEAF:
+              break
+            values.append(argument)
+            index += 1
+          if index < len(container):
+            conts.append((ARGS, operator, node, values, tail))
+            node = container[index]
+            tail = False
+            operator = None
+            continue
+          if kind == CALL:
+            func = operator
+            slots = [UNBOUND] * len(operator.scope)
+            slots[:len(values)] = values
+            operator = None
+            continue
+          value = operator.apply(context, node, values)
+          stack_trace.pop()
+        elif kind == BRANCH:
+          if len(container) != 4:
+            context.raise_eval_exception("Operator %s needs exactly 3 parameters. " % operator.op_name)
+          predicate = _leaf(context, container[1])
+          if predicate is _NOT_LEAF:
+            conts.append((IF, node, tail))
+            node = container[1]
+            tail = False
+          else:
+            if predicate not in [True, False]:
+              context.raise_eval_exception("%s should be of type bool, got %s" % (container[1], type(predicate)))
+            conts.append(_UNTRACE)
+            node = container[2 if predicate else 3]
+          operator = None
+          continue
+        elif kind == DEFINE and len(container) >= 3 and isinstance(container[1], ast.AtomNode):
+          scope = context.block_scope(node)
+          conts.append((BIND, container[1]))
+          conts.append((RETURN, context.frame, len(stack_trace) - 1))
+          context.frame = Frame([UNBOUND] * len(scope), context.frame, scope)
+          conts.append((BLOCK, node, 2))
+          node = container[2]
+          tail = False
+          operator = None
+          continue
+        else:
+          value = operator.reduce(context, node)
+          stack_trace.pop()
+        operator = None
+        node = None
+
+      # Hands `value` to the continuations until one of them has a node to evaluate.
+      while conts:
+        cont = conts.pop()
+        kind = cont[0]
+
+        if kind == ARGS:
+          values = cont[3]
+          values.append(value)
+          container = cont[2].container
+          index = len(values) + 1
+          while index < len(container):
+            argument = _leaf(context, container[index])
+            if argument is _NOT_LEAF:
+              break
+            values.append(argument)
+            index += 1
+          if index < len(container):
+            conts.append(cont)
+            node = container[index]
+            tail = False
+            break
+          if isinstance(cont[1], UserFunc):
+            func = cont[1]
+            slots = [UNBOUND] * len(func.scope)
+            slots[:len(values)] = values
+            tail = cont[4]
+            break
+          value = cont[1].apply(context, cont[2], values)
+          stack_trace.pop()
+
+        elif kind == BODY:
+          if value is not None:
+            continue
+          func_, index = cont[1], cont[2] + 1
+          body = func_.node.container
+          if index >= len(body):
+            context.raise_eval_exception("User function %s should contain one body. " % func_.name)
+          conts.append((BODY, func_, index))
+          node = body[index]
+          tail = True
+          break
+
+        elif kind == RETURN:
+          context.frame = cont[1]
+          del stack_trace[cont[2]:]
+
+        elif kind == IF:
+          if value not in [True, False]:
+            context.raise_eval_exception("%s should be of type bool, got %s" % (cont[1][1], type(value)))
+          conts.append(_UNTRACE)
+          node = cont[1].container[2 if value else 3]
+          tail = cont[2]
+          break
+
+        elif kind == UNTRACE:
+          stack_trace.pop()
+
+        elif kind == HEAD:
+          if value is None:
+            context.raise_eval_exception("Unknown literal '%s'. " % cont[1][0])
+          node = cont[1]
+          tail = cont[2]
+          operator = value
+          break
+
+        elif kind == BLOCK:
+          if value is not None:
+            continue
+          block, index = cont[1], cont[2] + 1
+          if index >= len(block):
+            context.raise_eval_exception("Definition of %s should contain one body. " % block[1].name)
+          conts.append((BLOCK, block, index))
+          node = block[index]
+          tail = False
+          break
+
+        else:  # BIND
+          atom = cont[1]
+          if atom.value is not None and context.frame is None:
+            context.shadowed_literals.add(atom.name)
+          context.bind(atom.name, value)
+          value = None
+      else:
+        return value
+  finally:
+    context.frame = entry_frame
+    del stack_trace[entry_trace:]
@@ -0,0 +1,134 @@
+from plisp import ast
+from plisp.entity import built_in_namespace, Scannable, BinaryOp, UnaryOp, Rope
+from typing import *
+from fractions import Fraction
+import plisp.constants as C
+
+# Builtins without side effects whose calls on literals are computed in advance.
+FOLDABLE = ["+", "*", "-", "/", "char", "strcat", "=", "<", ">"]
+
+
+def bound_names(node_list : List[ast.Node]) -> Optional[Set[str]]:
+  """
+  Every name that `node_list` binds somewhere, by a `define` or as a parameter. None
+  if `define` or `lambda` is used as a value, since their aliases could bind any
+  name.
+  """
+  names = set()
+  stack = list(node_list)
+  while stack:
+    node = stack.pop()
+    if isinstance(node, ast.AtomNode):
+      if node.name == C.DEFINE or node.name == C.LAMBDA:
+        return None
+      continue
+    container = node.container
+    if container and isinstance(container[0], ast.AtomNode) and container[0].name in (C.DEFINE, C.LAMBDA) and len(container) > 1:
+      target = container[1]
+      if isinstance(target, ast.AtomNode):
+        names.add(target.name)
+      else:
+        names.update(x.name for x in target if isinstance(x, ast.AtomNode))
+      stack.extend(container[2:])
+    else:
+      stack.extend(container)
+  return names
+
+
+def _is_constant(node : ast.Node, bound : Set[str]) -> bool:
+  return isinstance(node, ast.AtomNode) and node.kind != ast.SYMBOL and (node.kind == ast.STRING or node.name not in bound)
+
+
+def _compute(operator, values : list):
+  if isinstance(operator, Scannable):
+    if not all(operator.type_check(type(value)) for value in values):
+      return None
+    s = operator.begin()
+    for value in values:
+      s = operator.step(s, value)
+    return s
+  if isinstance(operator, BinaryOp):
+    if len(values) != 2 or not operator.type_check(type(values[0]), type(values[1])):
+      return None
+    return operator.step(values[0], values[1])
+  if isinstance(operator, UnaryOp):
+    if len(values) != 1 or not operator.type_check(type(values[0])):
+      return None
+    return operator.step(values[0])
+  return None
+
+
+def _constant(value, position : ast.CodePos, bound : Set[str]) -> Optional[ast.AtomNode]:
+  if type(value) is Rope:
+    value = str(value)
+  if type(value) is str:
+    return ast.AtomNode(value, position, str_value=True)
+  if type(value) is bool or type(value) is int or type(value) is Fraction:
+    name = str(value)
+  elif type(value) is float:
+    name = repr(value)
+  else:
+    return None
+  if name in bound:
+    return None
+  return ast.AtomNode(name, position)
+
+
+def _fold_list(node : ast.ListNode, bound : Set[str]) -> ast.Node:
+  container = node.container
+  if not container or not isinstance(container[0], ast.AtomNode) or container[0].name in bound:
+    return node
+  name = container[0].name
+
+  if name == C.IF:
+    predicate = container[1] if len(container) == 4 else None
+    if predicate is not None and _is_constant(predicate, bound) and predicate.kind == ast.BOOLEAN:
+      return container[2] if predicate.value else container[3]
+    return node
+
+  if name not in FOLDABLE or not all(_is_constant(x, bound) for x in container[1:]):
+    return node
+  try:
+    value = _compute(built_in_namespace[name], [x.value for x in container[1:]])
+  except (ArithmeticError, ValueError):
+    # Left for the evaluation to report.
+    return node
+  constant = _constant(value, node.position, bound)
+  return node if constant is None else constant
+
+
+def fold_constants(node_list : List[ast.Node], shadowed : Iterable[str] = ()) -> List[ast.Node]:
+  """
+  Replaces the calls of FOLDABLE builtins on literals by their values, and the `if`s
+  with a literal predicate by the branch taken, innermost first. Names bound by the
+  program, or listed in `shadowed` (e.g. defined by an earlier evaluation in the
+  same namespace), are left alone. Lists are folded in place; the folded top-level
+  forms are returned.
+  """
+  bound = bound_names(node_list)
+  if bound is None:
+    return node_list
+  bound.update(shadowed)
+
+  # Pre-order, so that reversed it visits the sub-nodes of a list before the list.
+  lists = []
+  stack = [node for node in node_list if isinstance(node, ast.ListNode)]
+  while stack:
+    node = stack.pop()
+    lists.append(node)
+    container = node.container
+    # The parameter list of a function is not evaluated.
+    is_function = container and isinstance(container[0], ast.AtomNode) and container[0].name in (C.DEFINE, C.LAMBDA)
+    for i, sub_node in enumerate(container):
+      if isinstance(sub_node, ast.ListNode) and not (is_function and i == 1):
+        stack.append(sub_node)
+
+  folded = {}
+  for node in reversed(lists):
+    container = node.container
+    for i, sub_node in enumerate(container):
+      if isinstance(sub_node, ast.ListNode):
+        container[i] = folded.get(id(sub_node), sub_node)
+    folded[id(node)] = _fold_list(node, bound)
+
+  return [folded.get(id(node), node) for node in node_list]
@@ -0,0 +1,49 @@
+from typing import *
+
+# Levels of the text written to an OutputSink.
+TRACE = 10   # Messages about the evaluation itself, for debugging.
+OUTPUT = 20  # What the program writes, with `display` and `print`.
+
+
+class OutputSink:
+  """
+  Collects the text written by a context: the output of the program, and the trace
+  messages when `level` lets them through. The text is kept in memory until
+  `drain`ed, unless a `stream` such as sys.stdout is given: then it is written to
+  it in batches of about `batch_size` characters, and on `flush`.
+  """
+
+  def __init__(self, level : int = OUTPUT, stream : Optional[TextIO] = None, batch_size : int = 2**16):
+    self.level = level
+    self.stream = stream
+    self.batch_size = batch_size
+    self._parts : List[str] = []
+    self._size = 0
+
+  def enabled(self, level : int) -> bool:
+    return level >= self.level
+
+  def write(self, text : str, level : int = OUTPUT):
+    if level < self.level:
+      return
+    self._parts.append(text)
+    self._size += len(text)
+    if self.stream is not None and self._size >= self.batch_size:
+      self.flush()
+
+  def trace(self, message : str):
+    self.write(message + "\n", TRACE)
+
+  def drain(self) -> str:
+    """
+    Returns the text kept so far, and forgets it.
+    """
+    text = "".join(self._parts)
+    self._parts = []
+    self._size = 0
+    return text
+
+  def flush(self):
+    if self.stream is not None and self._parts:
+      self.stream.write(self.drain())
+      self.stream.flush()
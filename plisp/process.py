@@ -0,0 +1,168 @@
+from plisp import ast
+from plisp.evaluate import Context, AtomicSignal, EvalException, default_pool
+from typing import *
+from concurrent.futures import Future
+import math
+import multiprocessing
+import queue
+import signal
+import threading
+
+try:
+  import resource
+except ImportError:  # Not available on Windows: workers run without rlimits.
+  resource = None
+
+
+def _multiprocessing_context():
+  # Workers are forked by a single-threaded server that has plisp imported already:
+  # replacements are started from pool threads, and forking a multi-threaded
+  # process could copy locks held by the other threads. Like spawned workers, they
+  # import the `__main__` module of the parent again, as `__mp_main__`.
+  if "forkserver" in multiprocessing.get_all_start_methods():
+    ctx = multiprocessing.get_context("forkserver")
+    ctx.set_forkserver_preload(["plisp.process"])
+    return ctx
+  return multiprocessing.get_context("spawn")
+
+
+def _set_cpu_limit(seconds : float):
+  # RLIMIT_CPU counts the whole life of the process, so every task moves the soft
+  # limit past the CPU time used so far. Going over it raises SIGXCPU, which kills
+  # the worker.
+  usage = resource.getrusage(resource.RUSAGE_SELF)
+  used = usage.ru_utime + usage.ru_stime
+  _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+  resource.setrlimit(resource.RLIMIT_CPU, (math.ceil(used + seconds), hard))
+
+
+def _serve(conn, memory_limit : Optional[int]):
+  if resource is not None and memory_limit:
+    resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+  while True:
+    try:
+      task = conn.recv()
+    except EOFError:
+      return
+    code, node_list, cpu_limit = task
+    if resource is not None and cpu_limit:
+      _set_cpu_limit(cpu_limit)
+    try:
+      # Definitions go to a namespace of the task: the next ones on this worker do
+      # not see them.
+      context = Context(code, AtomicSignal(), append_namespace=True)
+      result = ("ok", context.evaluate_list(node_list))
+    except EvalException as e:
+      result = ("error", str(e), [str(x) for x in e.plisp_trace_back])
+    except MemoryError:
+      result = ("error", "Memory limit exceeded! ", [])
+    except Exception as e:
+      result = ("error", "%s: %s" % (type(e).__name__, e), [])
+    try:
+      conn.send(result)
+    except Exception as e:
+      conn.send(("error", "Result cannot be sent back: %s" % e, []))
+
+
+class _Worker:
+
+  def __init__(self, ctx, memory_limit : Optional[int]):
+    self.conn, child_conn = ctx.Pipe()
+    self.process = ctx.Process(target=_serve, args=(child_conn, memory_limit), name="plisp-process", daemon=True)
+    self.process.start()
+    child_conn.close()
+
+  def kill(self):
+    self.process.kill()
+    self.process.join()
+    self.conn.close()
+
+  def close(self):
+    self.conn.close()
+    self.process.join(1)
+    if self.process.is_alive():
+      self.kill()
+
+
+class ProcessPool:
+  """
+  Evaluates parsed programs in pre-started worker processes, each in a fresh
+  context. A timed-out evaluation has its worker killed, whatever it is doing, and
+  the worker replaced; `cpu_limit` (seconds per evaluation) and `memory_limit`
+  (bytes of address space per worker) are enforced with rlimits. Calls from
+  several threads run on different workers, hence on different cores.
+  """
+
+  def __init__(self, max_workers : Optional[int] = None, cpu_limit : Optional[float] = None,
+               memory_limit : Optional[int] = None):
+    self.max_workers = max_workers or multiprocessing.cpu_count()
+    self.cpu_limit = cpu_limit
+    self.memory_limit = memory_limit
+    self._ctx = _multiprocessing_context()
+    self._idle = queue.SimpleQueue()
+    self._lock = threading.Lock()
+    self._closed = False
+    for _ in range(self.max_workers):
+      self._idle.put(_Worker(self._ctx, memory_limit))
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
+
+  def close(self):
+    """
+    Stops the idle workers; busy ones stop when their evaluation returns.
+    """
+    with self._lock:
+      self._closed = True
+    while True:
+      try:
+        self._idle.get_nowait().close()
+      except queue.Empty:
+        break
+
+  def _release(self, worker : _Worker):
+    with self._lock:
+      if not self._closed:
+        if not worker.process.is_alive():
+          worker.conn.close()
+          worker = _Worker(self._ctx, self.memory_limit)
+        self._idle.put(worker)
+        return
+    if worker.process.is_alive():
+      worker.close()
+
+  def evaluate_list(self, code, node_list : List[ast.Node], timeout=10) -> List[Any]:
+    if self._closed:
+      raise ValueError("The process pool is closed. ")
+    worker = self._idle.get()
+    try:
+      try:
+        worker.conn.send((code, node_list, self.cpu_limit))
+      except (TypeError, AttributeError, RecursionError) as e:
+        raise EvalException("Program cannot be sent to a worker: %s" % e)
+
+      if not worker.conn.poll(timeout):
+        worker.kill()
+        raise EvalException("Evaluation timeout! ")
+      try:
+        result = worker.conn.recv()
+      except EOFError:
+        worker.process.join()
+        if worker.process.exitcode == -getattr(signal, "SIGXCPU", 0):
+          raise EvalException("CPU limit exceeded! ")
+        raise EvalException("Worker exited with code %s. " % worker.process.exitcode)
+    finally:
+      self._release(worker)
+
+    if result[0] == "error":
+      raise EvalException(result[1], plisp_trace_back=result[2])
+    return result[1]
+
+  def submit(self, code, node_list : List[ast.Node], timeout=10) -> Future:
+    """
+    Runs `evaluate_list` in the background; the returned future holds its result.
+    """
+    return default_pool().submit(self.evaluate_list, code, node_list, timeout)
@@ -0,0 +1,182 @@
+from plisp.entity import Entity, Operator, UserFunc
+from typing import *
+import time
+
+
+class _Record:
+  __slots__ = ('name', 'position', 'calls', 'primitive_calls', 'tail_calls', 'inclusive', 'exclusive', 'callers')
+
+  def __init__(self, name : str, position):
+    self.name = name
+    self.position = position
+    self.calls = 0
+    # Calls made while no other call of the same function was running.
+    self.primitive_calls = 0
+    self.tail_calls = 0
+    self.inclusive = 0.0
+    self.exclusive = 0.0
+    # Per caller key: [calls, primitive calls, exclusive time, inclusive time].
+    self.callers : Dict[Any, list] = {}
+
+
+class _Trace(list):
+  """
+  The stack trace of a profiled context. Every operator call pushes its entity on
+  the trace and pops it when it returns, and a tail call replaces the entry of the
+  function it leaves, so the trace tells the profiler all it needs.
+  """
+
+  def __init__(self, profiler : 'Profiler', items : Iterable[Entity]):
+    super().__init__()
+    self.profiler = profiler
+    for entity in items:
+      self.append(entity)
+
+  def append(self, entity):
+    super().append(entity)
+    self.profiler._enter(entity, False)
+
+  def pop(self, index=-1):
+    entity = super().pop(index)
+    self.profiler._leave()
+    return entity
+
+  def __setitem__(self, index, entity):
+    super().__setitem__(index, entity)
+    # Only the top of the trace is replaced, by the tail calls.
+    self.profiler._leave()
+    self.profiler._enter(entity, True)
+
+  def __delitem__(self, index):
+    # Only the top of the trace is deleted, as `del trace[n:]`.
+    start = index.indices(len(self))[0] if isinstance(index, slice) else index
+    while len(self) > start:
+      self.pop()
+
+
+class _Shadowed(set):
+  """
+  Holds the builtins really shadowed, but reports every name as shadowed, so that the
+  compiled fast paths, which skip the trace, give way to the generic code.
+  """
+
+  def __bool__(self):
+    return True
+
+  def __contains__(self, name):
+    return True
+
+
+class Profiler:
+  """
+  Counts the calls, tail calls and wall time of every user function, by definition,
+  and builtin called by the contexts it is attached to, e.g. by `evaluate_list(...,
+  profiler=Profiler())`. Inclusive time counts the outermost calls of a recursive
+  function only. `report` returns a table; the profiler can also be loaded by
+  `pstats.Stats`.
+
+  Contexts that are not profiled do not pay for it: attaching replaces their stack
+  trace by one that times its pushes and pops.
+  """
+
+  def __init__(self, timer : Callable[[], float] = time.perf_counter):
+    self.timer = timer
+    self.records : Dict[Any, _Record] = {}
+    # Calls in progress, innermost last, as [key, start time, time of callees].
+    self._frames = []
+    self._active : Dict[Any, int] = {}
+
+  def attach(self, context):
+    context.stack_trace = _Trace(self, context.stack_trace)
+    context.shadowed_builtins = _Shadowed(context.shadowed_builtins)
+
+  def detach(self, context):
+    trace = context.stack_trace
+    if isinstance(trace, _Trace):
+      context.stack_trace = list(trace)
+      while self._frames:
+        self._leave()
+    context.shadowed_builtins = set(context.shadowed_builtins)
+
+  def _key(self, entity : Entity):
+    if isinstance(entity, UserFunc):
+      return entity.node
+    return entity
+
+  def _enter(self, entity : Entity, tail : bool):
+    key = self._key(entity)
+    record = self.records.get(key)
+    if record is None:
+      if isinstance(entity, UserFunc):
+        record = _Record(entity.name, entity.node.position)
+      elif isinstance(entity, Operator):
+        record = _Record(entity.op_name, None)
+      else:
+        record = _Record(str(entity), None)
+      self.records[key] = record
+    active = self._active.get(key, 0)
+    self._active[key] = active + 1
+    if tail:
+      record.tail_calls += 1
+    else:
+      record.calls += 1
+      if active == 0:
+        record.primitive_calls += 1
+    self._frames.append([key, self.timer(), 0.0])
+
+  def _leave(self):
+    now = self.timer()
+    key, start, callees = self._frames.pop()
+    elapsed = now - start
+    record = self.records[key]
+    active = self._active[key] - 1
+    self._active[key] = active
+    record.exclusive += elapsed - callees
+    if active == 0:
+      record.inclusive += elapsed
+    caller = self._frames[-1][0] if self._frames else None
+    if self._frames:
+      self._frames[-1][2] += elapsed
+    edge = record.callers.get(caller)
+    if edge is None:
+      edge = record.callers[caller] = [0, 0, 0.0, 0.0]
+    edge[0] += 1
+    if active == 0:
+      edge[1] += 1
+      edge[3] += elapsed
+    edge[2] += elapsed - callees
+
+  def _label(self, key) -> Tuple[str, int, str]:
+    # pstats' (file, line, function) of a key.
+    record = self.records[key]
+    if record.position is None:
+      return ("~", 0, "<builtin %s>" % record.name)
+    return ("<plisp>", record.position.row, record.name)
+
+  def create_stats(self):
+    """
+    Fills `stats` in the format of `pstats.Stats`, which calls it.
+    """
+    self.stats = {}
+    for key, record in self.records.items():
+      callers = {}
+      for caller, (calls, primitive_calls, exclusive, inclusive) in record.callers.items():
+        if caller is not None:
+          callers[self._label(caller)] = (calls, primitive_calls, exclusive, inclusive)
+      self.stats[self._label(key)] = (record.primitive_calls, record.calls, record.exclusive, record.inclusive, callers)
+
+  def report(self, sort : str = "exclusive", limit : Optional[int] = None) -> str:
+    """
+    A table of the records sorted by `sort`, one of "calls", "tail_calls",
+    "inclusive" and "exclusive", in decreasing order.
+    """
+    records = sorted(self.records.values(), key=lambda record: getattr(record, sort), reverse=True)
+    if limit is not None:
+      records = records[:limit]
+    lines = ["%10s %10s %10s %10s %10s  %s" % ("calls", "tail calls", "inclusive", "exclusive", "per call", "name")]
+    for record in records:
+      name = record.name if record.position is None else "%s, line %d" % (record.name, record.position.row)
+      per_call = record.exclusive / (record.calls + record.tail_calls) if record.calls + record.tail_calls else 0.0
+      lines.append("%10d %10d %10.6f %10.6f %10.6f  %s" % (record.calls, record.tail_calls, record.inclusive, record.exclusive,
+                                                          per_call, name))
+    return "\n".join(lines)
@@ -1,5 +1,7 @@
 from plisp.ast import parse
+from plisp import ast
 import io
+import pickle
 from tests.utils import assert_exception
 
 def test_ast_one(code : str):
@@ -45,4 +47,77 @@ print(test_ast("""
   (define avg-val
     (average (func x) (func y)))
   (- avg-val mid-val))
-"""))
\ No newline at end of file
+"""))
+atoms = parse(io.StringIO('(x 1 -2.5 True False "s" 1e3)'))[0]
+assert [x.kind for x in atoms] == ["symbol", "number", "number", "boolean", "boolean", "string", "number"]
+assert [x.value for x in atoms] == [None, 1.0, -2.5, True, False, "s", 1000.0]
+
+node = test_ast_one('(a "b\nc" d)\n')
+assert (node.position.row, node.position.column) == (1, 1)
+assert [(x.position.row, x.position.column) for x in node] == [(1, 3), (2, 3), (2, 5)]
+assert node[1].name == "b\nc"
+assert test_ast_one("'it\\'s'").name == "it's"
+assert_exception(lambda : test_ast_one('(a "b'), ValueError)
+
+# Nesting depth is not bounded by the Python stack.
+depth = 100000
+node = parse(io.StringIO("(cons 1 " * depth + "null" + ")" * depth))[0]
+for _ in range(depth - 1):
+  node = node[2]
+assert node[2].name == "null"
+assert_exception(lambda : parse(io.StringIO("(" * depth)), ValueError)
+
+# Nodes are compact: no instance dict, symbol names interned, positions packed.
+node = test_ast_one("(f x (g x) 2.5 2.5)")
+assert not hasattr(node, "__dict__") and not hasattr(node[1], "__dict__")
+assert node[1].name is node[2][1].name and node[3].value is node[4].value
+assert (node[2].position.row, node[2].position.column) == (1, 6)
+copy = pickle.loads(pickle.dumps(node))
+assert str(copy) == str(node) and (copy[3].position.row, copy[3].position.column) == (1, 15)
+from plisp.entity import built_in_namespace
+assert all(test_ast_one("(%s)" % name)[0].name is name for name in built_in_namespace)
+
+# Dumps are loaded back as equal trees, with their positions and values.
+nodes = parse(io.StringIO('(define (f x) (* x 1/3 2.5 "a\\"b"))\n(f True)\nnull'))
+loaded = ast.loads(ast.dumps(nodes))
+assert [str(x) for x in loaded] == [str(x) for x in nodes]
+assert [x.value for x in loaded[0][2]] == [x.value for x in nodes[0][2]]
+assert [str(x.position) for x in loaded[0][2]] == [str(x.position) for x in nodes[0][2]]
+assert loaded[0][1][0].name is nodes[0][1][0].name
+node = ast.loads(ast.dumps(parse(io.StringIO("(cons 1 " * depth + "null" + ")" * depth))))[0]
+for _ in range(depth - 1):
+  node = node[2]
+assert node[2].name == "null"
+assert_exception(lambda : ast.loads(b"garbage"), ValueError)
+
+# Any layout is loaded back, and loaded trees pickle as plain ones.
+def positions(node_list):
+  result = []
+  stack = list(reversed(node_list))
+  while stack:
+    node = stack.pop()
+    result.append((str(node.position), getattr(node, "name", None), repr(getattr(node, "value", None))))
+    if isinstance(node, ast.ListNode):
+      stack.extend(reversed(node.container))
+  return result
+
+nodes = parse(io.StringIO('  (f  "a\\nb" (g)\n\n   ((h) 1_0 nan 0x1)x)\n( y )'))
+nodes.append(ast.ListNode([ast.AtomNode("a", ast.pack_position(5, 3)), ast.AtomNode("b", ast.pack_position(2, 9))], ast.pack_position(4, 1)))
+loaded = ast.loads(ast.dumps(nodes))
+assert positions(loaded) == positions(nodes)
+copy = pickle.loads(pickle.dumps(loaded))
+assert type(copy[0]) is ast.ListNode and positions(copy) == positions(nodes)
+
+# An arena gives back the same trees, read when they are used.
+source = '(define (f x) (* x 1/3 "a"))\n  (f\n 2) null (g (h) ((i)))'
+nodes = parse(io.StringIO(source), arena=True)
+assert positions(nodes) == positions(parse(io.StringIO(source)))
+assert positions(pickle.loads(pickle.dumps(nodes))) == positions(nodes)
+parser = ast.Parser(arena=True)
+nodes = [node for chunk in source for node in parser.feed(chunk)] + parser.close()
+assert positions(nodes) == positions(parse(io.StringIO(source)))
+assert_exception(lambda : parse(io.StringIO("(f))"), arena=True), ValueError)
+from plisp.evaluate import evaluate_list
+from fractions import Fraction
+source = '(define (f x) (* x 1/3))\n  (f\n 2) null'
+assert evaluate_list(source, parse(io.StringIO(source), arena=True), append_namespace=True)[:2] == [None, Fraction(2, 3)]
@@ -0,0 +1,64 @@
+from plisp import bytecode
+from plisp.__main__ import main
+from plisp.evaluate import evaluate_list, EvalException
+from tests.utils import assert_exception
+import os
+import tempfile
+
+prelude = "(define (sq x) (* x x))\n(define third 1/3)\n(sq 12)\n"
+
+with tempfile.TemporaryDirectory() as directory:
+  source = os.path.join(directory, "prelude.lisp")
+  with open(source, "w") as f:
+    f.write(prelude)
+  assert main(["compile", source]) == 0
+  compiled = bytecode.compiled_path(source)
+  assert compiled.endswith("prelude.plc") and os.path.exists(compiled)
+
+  program = bytecode.load(compiled, source)
+  assert program.code == prelude and program.code is program.code
+  assert evaluate_list(program.code, program, append_namespace=True) == [None, None, 144]
+  assert_exception(lambda : bytecode.load(compiled, source, exact=False), ValueError)
+
+  # The source is hashed when its time or size changed.
+  os.utime(source, ns=(0, 0))
+  assert len(bytecode.load(compiled, source)) == 3
+  with open(source, "w") as f:
+    f.write(prelude + "(sq 3)\n")
+  assert_exception(lambda : bytecode.load(compiled, source), ValueError)
+  assert len(bytecode.load(compiled)) == 3
+
+  # load_source compiles again what is out of date.
+  assert evaluate_list("", bytecode.load_source(source), append_namespace=True) == [None, None, 144, 9]
+  assert len(bytecode.load(compiled, source)) == 4
+
+  for data in (b"", b"PLSP", b"garbage" * 20):
+    with open(compiled, "wb") as f:
+      f.write(data)
+    assert_exception(lambda : bytecode.load(compiled), ValueError)
+  assert len(bytecode.load_source(source)) == 4
+
+  # Tracebacks show the lines of the source.
+  broken = os.path.join(directory, "broken.lisp")
+  with open(broken, "w") as f:
+    f.write("(define (f x)\n  (car x))\n(f 1)\n")
+  output = os.path.join(directory, "out.plc")
+  assert main(["compile", "-o", output, broken]) == 0
+  program = bytecode.load(output, broken)
+  try:
+    evaluate_list(program.code, program, append_namespace=True)
+  except EvalException as e:
+    assert "line 1, in" in e.track_back2str() and "(define (f x)" in e.track_back2str()
+  else:
+    raise Exception("Should throw exception %s" % EvalException)
+
+  with open(broken, "w") as f:
+    f.write("(f 1")
+  assert main(["compile", broken, source]) == 1
+
+  # Compiled programs are smaller than their source.
+  library = os.path.join(directory, "library.lisp")
+  with open(library, "w") as f:
+    f.writelines("(define (f-%d x y) (if (< x %d) (+ x (* y 2.5)) (f-%d (- x 1) y)))\n" % (i, i, i) for i in range(1000))
+  bytecode.compile_file(library)
+  assert os.path.getsize(bytecode.compiled_path(library)) < os.path.getsize(library)
@@ -0,0 +1,46 @@
+from plisp.cache import ProgramCache
+from plisp.evaluate import Session
+from plisp.ast import parse
+from tests.utils import assert_exception
+import io
+import os
+import tempfile
+
+cache = ProgramCache()
+program = "(define (sq x) (* x x)) (sq 3)"
+first = cache.parse(program)
+assert [str(x) for x in first] == [str(x) for x in parse(io.StringIO(program))]
+second = cache.parse(program)
+assert all(x is y for x, y in zip(first, second)) and first is not second
+assert (cache.hits, cache.misses, len(cache)) == (1, 1, 1)
+assert cache.parse(program, exact=False)[1][1].value == 3.0
+assert type(cache.parse(program)[1][1].value) is int
+assert_exception(lambda : cache.parse("(sq"), ValueError)
+
+# The least recently used programs go first once the limit is passed.
+cache = ProgramCache(max_bytes=20)
+cache.parse("(+ 1 2 3 4)")
+cache.parse("(* 1 2 3 4)")
+cache.parse("(+ 1 2 3 4)")
+assert (cache.hits, len(cache), cache.size) == (0, 1, 11)
+cache.parse("(" * 30 + ")" * 30)
+assert len(cache) == 1
+
+# Sessions sharing a cache share the trees and the code compiled on them.
+cache = ProgramCache()
+assert Session(cache=cache).evaluate(program) == [None, 9]
+assert Session(cache=cache).evaluate(program) == [None, 9]
+assert Session(cache=cache).evaluate("(define (sq x) (+ x x)) (sq 3)") == [None, 6]
+assert Session(cache=cache).evaluate(program, optimize=True) == [None, 9]
+assert cache.hits == 1
+
+# The directory keeps the programs across caches.
+with tempfile.TemporaryDirectory() as directory:
+  ProgramCache(directory=directory).parse(program)
+  assert len(os.listdir(directory)) == 1
+  cache = ProgramCache(directory=directory)
+  assert [str(x) for x in cache.parse(program)] == [str(x) for x in first]
+  path = os.path.join(directory, os.listdir(directory)[0])
+  with open(path, "wb") as f:
+    f.write(b"garbage")
+  assert [str(x) for x in ProgramCache(directory=directory).parse(program)] == [str(x) for x in first]
@@ -1,4 +1,5 @@
 from tests.utils import assert_exception
+from plisp.evaluate import EvalException
 from tests.utils import test_evaluate
 import re
 
@@ -196,4 +197,62 @@ print(test_evaluate("""
 
 print(test_evaluate("""
 (list 1 2 3)
-""", expected="(1.0, (2.0, (3.0, null)))"))
\ No newline at end of file
+""", expected="(1.0, (2.0, (3.0, null)))"))
+print(test_evaluate("""
+(define (make-countdown)
+  (define (countdown n)
+    (if (= n 0) 0 (countdown (- n 1))))
+  countdown)
+((make-countdown) 5)
+""", expected="None|0.0"))
+
+print(test_evaluate("""
+(define (outer x)
+  (define (+ a b) (* a b))
+  (define (inner y) (+ x y))
+  (inner 3))
+(outer 4)
+(+ 4 3)
+""", expected="None|12.0|7.0"))
+
+print(test_evaluate("""
+(define (f) (define 1.0 3) 1.0)
+(f)
+1.0
+""", expected="None|3.0|1.0"))
+
+# Closures created from the same node share its layout, each with its own frame.
+print(test_evaluate("""
+(define (adders n acc)
+  (if (< n 1) acc
+    (adders (- n 1) (cons (lambda (x) (+ x n)) acc))))
+(define fs (adders 3 null))
+((car fs) 10)
+((car (cdr fs)) 10)
+((car (cdr (cdr fs))) 10)
+""", expected="None|None|11.0|12.0|13.0"))
+
+# Free variables are bound late: a call sees their current values, and functions
+# can refer to names defined after them.
+print(test_evaluate("""
+(define x 1)
+(define (f) x)
+(define x 2)
+(f)
+""", expected="None|None|None|2.0"))
+
+print(test_evaluate("""
+(define (even n) (if (= n 0) True (odd (- n 1))))
+(define (odd n) (if (= n 0) False (even (- n 1))))
+(even 10)
+(odd 7)
+""", expected="None|None|True|True"))
+
+assert_exception(lambda : test_evaluate("(define (f) (g)) (f)"), EvalException)
+
+# A parameter bound to None is bound: it does not fall through to the global.
+print(test_evaluate("""
+(define x 5)
+(define (f x) (list x))
+(f (define z 1))
+""", expected="None|None|(None, null)"))
@@ -0,0 +1,37 @@
+from tests.utils import assert_exception
+from tests.utils import test_evaluate
+from plisp.evaluate import EvalException
+
+print(test_evaluate("""
+(define (f x y) (+ (* x y) (- x (/ y 2))))
+(f 3 4)
+(< 1 2)
+(> "b" "a")
+(expt 2 10)
+""", expected="None|13.0|True|True|1024.0"))
+
+# The fast path gives way once a name or a literal is shadowed.
+print(test_evaluate("""
+(define (f x) (+ x 1))
+(f 1)
+(define (+ a b) (* a b))
+(f 5)
+(define 1.0 3)
+(- 10 1.0)
+""", expected="None|2.0|None|5.0|None|7.0"))
+
+print(test_evaluate("""
+(define (g - x) (- x 1))
+(g + 1)
+(define (h x)
+  (define y (* x 2))
+  (+ y x))
+(h 2)
+""", expected="None|2.0|None|6.0"))
+
+print(test_evaluate("(+ 1 2)", expected="3.0", stackless=True))
+
+assert_exception(lambda : test_evaluate('(+ 1 "a")'), EvalException)
+assert_exception(lambda : test_evaluate('(- True 1)'), EvalException)
+assert_exception(lambda : test_evaluate('(< 1 "a")'), EvalException)
+assert_exception(lambda : test_evaluate('(+ 1 x)'), EvalException)
@@ -0,0 +1,40 @@
+from plisp.evaluate import evaluate_async, EvalException, WorkerPool
+import asyncio
+import time
+
+async def main():
+  pool = WorkerPool(max_workers=4)
+
+  # Many concurrent evaluations share a few threads.
+  results = await asyncio.gather(*[evaluate_async("(+ %d 1)" % i, pool=pool) for i in range(200)])
+  assert results == [[i + 1.0] for i in range(200)]
+  assert len(pool._threads) <= 4
+
+  # Every evaluation has globals of its own, builtins redefined included.
+  results = await asyncio.gather(evaluate_async("(define (+ a b) 0) (+ 1 2)", pool=pool),
+                                 *[evaluate_async("(+ 1 2)", pool=pool) for _ in range(20)])
+  assert results == [[None, 0]] + [[3]] * 20
+  assert await evaluate_async("(+ 1 2)", pool=pool) == [3]
+
+  loop = "(define (loop n) (loop (+ n 1))) (loop 0)"
+  try:
+    await evaluate_async(loop, timeout=0.5, pool=pool)
+    assert False
+  except EvalException:
+    pass
+
+  # Cancelling the caller kills the evaluation and frees its worker.
+  pool = WorkerPool(max_workers=1)
+  task = asyncio.ensure_future(evaluate_async(loop, timeout=60, pool=pool))
+  await asyncio.sleep(0.2)
+  task.cancel()
+  try:
+    await task
+    assert False
+  except asyncio.CancelledError:
+    pass
+  begin = time.time()
+  assert await evaluate_async("(* 2 3)", timeout=5, pool=pool) == [6.0]
+  assert time.time() - begin < 2
+
+asyncio.run(main())
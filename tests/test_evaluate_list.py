@@ -0,0 +1,51 @@
+from tests.utils import assert_exception
+from tests.utils import test_evaluate
+from plisp.evaluate import EvalException
+
+print(test_evaluate("""
+(define l (list 1 2 3))
+(length l)
+(length null)
+(length "abc")
+(nth l 2)
+(cdr (cdr (cdr l)))
+(= (cdr (list 1)) null)
+""", expected="None|3|0|3|3.0|null|True"))
+
+print(test_evaluate("""
+(define (inc x) (+ x 1))
+(map inc (list 1 2 3))
+(map (lambda (x) (* x x)) (vector 1 2 3))
+(filter (lambda (x) (> x 1)) (list 1 2 3))
+(fold + 0 (list 1 2 3 4))
+(fold (lambda (acc x) (cons x acc)) null (list 1 2 3))
+(map car (list (list 1) (list 2)))
+""", expected="None|(2.0, (3.0, (4.0, null)))|[1.0, 4.0, 9.0]|(2.0, (3.0, null))|10.0|(3.0, (2.0, (1.0, null)))|(1.0, (2.0, null))"))
+
+print(test_evaluate("""
+(append (list 1 2) null (list 3))
+(append (vector 1) (vector 2 3))
+(nth (vector 4 5 6) 1)
+(length (append (list 1 2) (list 3 4 5)))
+""", expected="(1.0, (2.0, (3.0, null)))|[1.0, 2.0, 3.0]|5.0|5"))
+
+# Lists are printed without recursion, whatever their length.
+test_evaluate("""
+(define (build n acc) (if (< n 1) acc (build (- n 1) (cons n acc))))
+(length (build 100000 null))
+(build 100000 null)
+""")
+
+assert_exception(lambda : test_evaluate("(nth (list 1 2) 2)"), EvalException)
+assert_exception(lambda : test_evaluate("(length (cons 1 2))"), EvalException)
+
+# A builtin applied by map or fold reports the value, not an argument of the call.
+try:
+  test_evaluate('(fold + 0 (list 1 "a"))')
+  assert False
+except EvalException as e:
+  assert str(e).startswith("Operator + got an unexpected type: <class 'str'>"), str(e)
+assert_exception(lambda : test_evaluate("(map 1 (list 1 2))"), EvalException)
+assert_exception(lambda : test_evaluate("(map (lambda (a b) a) (list 1 2))"), EvalException)
+assert_exception(lambda : test_evaluate("(append (list 1) (vector 2))"), EvalException)
+assert_exception(lambda : test_evaluate("(filter (lambda (x) x) (list 1 2))"), EvalException)
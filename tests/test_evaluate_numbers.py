@@ -0,0 +1,38 @@
+from tests.utils import assert_exception
+from tests.utils import test_evaluate
+from plisp.evaluate import Session, EvalException
+
+print(test_evaluate("""
+(define (fact n) (if (< n 1) 1 (* n (fact (- n 1)))))
+(fact 25)
+(expt 2 100)
+(- 10 3)
+(length "abc")
+(nth (list 1 2 3) 1)
+""", expected="None|15511210043330985984000000|1267650600228229401496703205376|7|3|2", exact=True))
+
+# Exact numbers are divided exactly, floats are not.
+print(test_evaluate("""
+(/ 6 3)
+(/ 1 3)
+(+ 1/3 2/3)
+(* 2/3 3/4)
+(expt 2 -2)
+(/ 1.0 4)
+(* 1.5 2)
+(+ 1/2 0.25)
+""", expected="2|1/3|1|1/2|1/4|0.25|3.0|0.75", exact=True))
+
+# The legacy mode reads every number as a float; counts stay integers.
+print(test_evaluate("(expt 2 3) (/ 6 3) (length (list 1))", expected="8.0|2.0|1"))
+
+assert Session().evaluate("(* 6 7)") == [42]
+assert type(Session().evaluate("(* 6 7)")[0]) is int
+assert type(Session(exact=False).evaluate("(* 6 7)")[0]) is float
+
+assert_exception(lambda : test_evaluate("(/ 1 0)", exact=True), ZeroDivisionError)
+assert_exception(lambda : test_evaluate("(+ 1/2 True)", exact=True), EvalException)
+
+# Integers too long to be written are an error of the program.
+assert_exception(lambda : Session().evaluate("(display (expt 10 5000))"), EvalException)
+assert_exception(lambda : Session().evaluate("(print 1 (expt 10 5000))"), EvalException)
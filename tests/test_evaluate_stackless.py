@@ -0,0 +1,44 @@
+from tests.utils import assert_exception
+from tests.utils import test_evaluate
+from plisp.evaluate import EvalException
+
+# Non-tail recursion is only limited by memory.
+test_evaluate("""
+(define (sum n)
+  (if (< n 1) 0
+    (+ n (sum (- n 1)))))
+(sum 100000)
+""", "None|5000050000.0", stackless=True)
+
+test_evaluate("""
+(define (build n)
+  (if (< n 1) null
+    (cons n (build (- n 1)))))
+(define (total l n)
+  (if (< n 1) 0
+    (+ (car l) (total (cdr l) (- n 1)))))
+(total (build 50000) 50000)
+""", "None|None|1250025000.0", stackless=True)
+
+# Same results as the compiled closures.
+for code, expected in [
+  ("(define y (define z (* 2 3)) z) y", "None|6.0"),
+  ("(define (add a) (lambda (b) (+ a b))) ((add 1) 2)", "None|3.0"),
+  ("(define (f x) (define g (* x x)) (+ g 1)) (f 3)", "None|10.0"),
+  ("(strcat \"a\" (char 98) \"c\")", "abc"),
+  ("(car (cdr (list 1 2 3)))", "2.0"),
+]:
+  assert test_evaluate(code, expected) == test_evaluate(code, expected, stackless=True)
+
+assert_exception(lambda : test_evaluate("(+ 1 \"a\")", stackless=True), EvalException)
+assert_exception(lambda : test_evaluate("(define (f x) x) (f 1 2)", stackless=True), EvalException)
+assert_exception(lambda : test_evaluate("(if \"a\" 2 3)", stackless=True), EvalException)
+
+# A literal head is not an operator, as in the compiled closures.
+for code in ["(1 2)", "(define (f) (2 3)) (f)"]:
+  try:
+    test_evaluate(code, stackless=True)
+  except EvalException as e:
+    assert "Unknown literal" in str(e), e
+  else:
+    raise Exception("Should throw exception %s" % EvalException)
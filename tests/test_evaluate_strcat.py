@@ -0,0 +1,65 @@
+from tests.utils import test_evaluate
+import time
+
+print(test_evaluate("""
+(strcat "a" "b" (char 99))
+(strcat)
+(= (strcat "ab" "c") "abc")
+""", expected="abc||True"))
+
+# Accumulating into a long string takes linear time; the result behaves as a string.
+chunk = "x" * 99 + "y"
+begin = time.time()
+print(test_evaluate("""
+(define (build n acc)
+  (if (< n 1) acc
+    (build (- n 1) (strcat acc "%s"))))
+(define s (build 100000 ""))
+(length s)
+(nth s 99)
+(< (build 3 "") s)
+(define t (build 2 s))
+(length s)
+(length t)
+""" % chunk, expected="None|None|10000000|y|True|None|10000000|10000200"))
+assert time.time() - begin < 10
+
+# So does accumulating on the right, and ropes sharing a suffix do not see each
+# other's pieces either.
+begin = time.time()
+print(test_evaluate("""
+(define (build n acc)
+  (if (< n 1) acc
+    (build (- n 1) (strcat "%s" acc))))
+(define s (build 100000 ""))
+(length s)
+(nth s 99)
+(define left (strcat "L" s))
+(define right (strcat "R" s))
+(nth left 0)
+(nth right 0)
+(= (strcat (build 3 "") "z" (build 3 "")) (strcat (build 3 "z") (build 3 "")))
+""" % chunk, expected="None|None|10000000|y|None|None|L|R|True"))
+assert time.time() - begin < 10
+
+# Ropes sharing a prefix do not see each other's pieces.
+print(test_evaluate("""
+(define (repeat n s acc) (if (< n 1) acc (repeat (- n 1) s (strcat acc s))))
+(define base (repeat 300 "a" ""))
+(define left (strcat base "L"))
+(define right (strcat base "R"))
+(nth left 300)
+(nth right 300)
+(length base)
+(= left (strcat base "L"))
+""", expected="None|None|None|None|L|R|300|True"))
+
+# Results handed back to the caller are plain strings.
+from plisp.evaluate import Session, Context, AtomicSignal
+import json
+long = '(define (build n acc) (if (< n 1) acc (build (- n 1) (strcat acc "%s")))) (build 10 "")' % chunk
+results = Session().evaluate(long)
+assert type(results[1]) is str and json.dumps(results) == json.dumps([None, chunk * 10])
+assert type(Session().evaluate(long, stackless=True)[1]) is str
+assert [type(x) for x in Context("", AtomicSignal(), append_namespace=True).feed(long)] == [type(None), str]
+assert [type(x) for x in Context("", AtomicSignal(), append_namespace=True).evaluate_stream([long])] == [type(None), str]
@@ -0,0 +1,25 @@
+from plisp.evaluate import Context, AtomicSignal
+from plisp.ast import Parser, iter_parse
+from io import StringIO
+from tests.utils import assert_exception
+
+# Forms are returned as soon as they are complete, whatever the chunk boundaries.
+parser = Parser()
+assert parser.feed("(define x") == []
+assert parser.pending
+forms = parser.feed(" 1) (+ x") + parser.feed(" 2) x")
+assert [str(x) for x in forms] == ["(define x 1)", "(+ x 2)"]
+assert [str(x) for x in parser.close()] == ["x"]
+assert not parser.pending
+
+parser = Parser()
+parser.feed("(+ 1")
+assert_exception(lambda : parser.close(), ValueError)
+
+assert len(list(iter_parse(StringIO("(a b) c (d 'e f')" * 100), chunk_size=7))) == 300
+
+context = Context("", AtomicSignal(), append_namespace=True)
+assert context.feed("(define (sq x)\n") == []
+assert context.feed("  (* x x))\n(sq") == [None]
+assert context.feed(" 3)\n") == [9.0]
+assert list(context.evaluate_stream(StringIO("(sq 4)\n(+ 1 2)\n"))) == [16.0, 3.0]
@@ -7,4 +7,42 @@ test_evaluate("""
     (fact (- n 1) (* n sum)))
 )
 (fact 3 1)
-""", "None|6.0")
\ No newline at end of file
+""", "None|6.0")
+# Compiled code is cached on the nodes and must be reusable by a fresh context.
+from plisp.ast import parse
+from plisp.evaluate import evaluate_list
+from io import StringIO
+
+fact_code = """
+(define (fact n sum)
+  (if (= n 0) sum
+    (fact (- n 1) (* n sum)))
+)
+(fact 5 1)
+"""
+fact_nodes = parse(StringIO(fact_code))
+assert evaluate_list(fact_code, fact_nodes, append_namespace=True)[-1] == 120.0
+assert evaluate_list(fact_code, fact_nodes, append_namespace=True)[-1] == 120.0
+
+# Any call in tail position runs in constant stack: mutual recursion, calls to other
+# functions nested in several ifs, and calls to lambdas.
+test_evaluate("""
+(define (ping n other) (if (< n 1) True (other (- n 1) ping)))
+(define (pong n other) (if (< n 1) False (other (- n 1) pong)))
+(ping 100000 pong)
+""", "None|None|True")
+
+test_evaluate("""
+(define (down n acc) (if (< n 1) acc (down (- n 1) (+ acc 1))))
+(define (count n acc)
+  (if (< n 1) acc
+    (if (< n 50000)
+      (down n acc)
+      (count (- n 1) (+ acc 2)))))
+(count 100000 0)
+""", "None|None|150001.0")
+
+test_evaluate("""
+(define (loop f n) (if (< n 1) n (f f (- n 1))))
+(loop (lambda (g m) (loop g m)) 100000)
+""", "None|0.0")
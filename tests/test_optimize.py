@@ -0,0 +1,49 @@
+from tests.utils import assert_exception
+from tests.utils import test_evaluate
+from plisp.optimize import fold_constants
+from plisp.ast import parse
+from io import StringIO
+
+
+def fold(code : str, shadowed=()) -> str:
+  # On one line, without the indentation of nested lists.
+  return ' '.join(' '.join(str(node).split()) for node in fold_constants(parse(StringIO(code)), shadowed))
+
+
+assert fold("(+ 1 (* 2 3))") == "7"
+assert fold("(/ 1.0 4)") == "0.25"
+assert fold("(/ 1 3)") == "1/3"
+assert fold('(strcat "a" (char 98) "c")') == '"abc"'
+assert fold("(if (< 1 2) (f 1) (g 2))") == "(f 1)"
+assert fold("(if (= 1 2) x (- 10 4))") == "6"
+assert fold("(define (f x) (+ x (* 2 2)))") == "(define (f x) (+ x 4))"
+# Calls on variables are left to the evaluation.
+assert fold("(+ x 1)") == "(+ x 1)"
+# So are errors.
+assert fold("(/ 1 0)") == "(/ 1 0)"
+assert fold('(+ 1 "a")') == '(+ 1 "a")'
+
+# Names bound anywhere in the program are not folded, be it by a `define` or as a
+# parameter.
+assert fold("(define (+ a b) a) (+ 1 2)") == "(define (+ a b) a) (+ 1 2)"
+assert fold("(define (f +) (+ 1 2))") == "(define (f +) (+ 1 2))"
+assert fold("(define 1.0 2) (+ 1.0 1)") == "(define 1.0 2) (+ 1.0 1)"
+assert fold("(define 3 0) (+ 1 2)") == "(define 3 0) (+ 1 2)"
+assert fold("(+ 1 2)", shadowed=["+"]) == "(+ 1 2)"
+# `define` under another name can bind anything.
+assert fold("(define def define) (+ 1 2)") == "(define def define) (+ 1 2)"
+
+print(test_evaluate("""
+(define (f x) (if (> 2 1) (* x (+ 1 2)) (/ 1 0)))
+(f 2)
+(strcat "a" "b")
+""", expected="None|6.0|ab", optimize=True))
+
+print(test_evaluate("""
+(define 1.0 2) (+ 1.0 1)
+(define (g +) (+ 1 2))
+(g *)
+""", expected="None|3.0|None|2.0", optimize=True))
+
+# Raised as it is without folding.
+assert_exception(lambda : test_evaluate("(/ 1 0)", optimize=True), ZeroDivisionError)
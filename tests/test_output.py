@@ -0,0 +1,52 @@
+from plisp.ast import parse
+from plisp.evaluate import evaluate_list, Session
+from plisp.output import OutputSink, TRACE
+from plisp.entity import null
+from tests.utils import test_evaluate
+from io import StringIO
+import contextlib
+
+code = """
+(define (greet name)
+  (define greeting (display "hello, "))
+  (define line (print name (+ 1 2)))
+  name)
+(greet "bob")
+(print)
+(display (list 1 2))
+"""
+output = OutputSink()
+assert evaluate_list(code, parse(StringIO(code)), output=output) == [None, "bob", null, null]
+assert output.drain() == "hello, bob 3\n\n(1, (2, null))"
+assert output.drain() == ""
+
+# Nothing is written to stdout, not even by comparisons.
+stdout = StringIO()
+with contextlib.redirect_stdout(stdout):
+  print(test_evaluate('(= 1 1) (= "a" "b") (print 1)', expected="True|False|null"))
+assert stdout.getvalue() == "True|False|null\n"
+
+# Printing returns null, so it can end the body of a function.
+output = OutputSink()
+session = Session(output=output)
+assert session.evaluate('(define (say x) (print "hi" x)) (say 1)')[1] is null
+assert output.drain() == "hi 1\n"
+
+# A stream gets the output in batches, and the rest at the end of the evaluation.
+stream = StringIO()
+session = Session(output=OutputSink(stream=stream, batch_size=10))
+session.evaluate('(display "12345")')
+assert stream.getvalue() == "12345"
+session.evaluate('(display "1234") (display "5678") (display "9")')
+assert stream.getvalue() == "12345123456789"
+
+# Trace messages are only kept at the trace level.
+output = OutputSink(level=TRACE)
+session = Session(output=output)
+session.evaluate("(define a 1) (define (f x) (+ x a))")
+assert output.drain() == "function f at (1, 14), free variables: a\n"
+session.evaluate("(define (g x) (+ a (* a x)))")
+assert output.drain() == "function g at (1, 1), free variables: a\n"
+output.level = OutputSink().level
+session.evaluate("(define (g x) x)")
+assert output.drain() == ""
@@ -0,0 +1,51 @@
+from plisp.process import ProcessPool
+from plisp.evaluate import EvalException
+from plisp import ast
+from tests.utils import assert_exception
+import io
+import pickle
+import time
+
+def parse(code):
+  return ast.parse(io.StringIO(code))
+
+# Compiled nodes pickle without their closures, and compile again once unpickled.
+nodes = parse("(+ 1 2)")
+from plisp.evaluate import Context, AtomicSignal
+Context("", AtomicSignal()).evaluate_list(nodes)
+assert pickle.loads(pickle.dumps(nodes))[0].code(Context("", AtomicSignal())) == 3.0
+
+# Workers import this module again, as `__mp_main__`: they must not start pools.
+if __name__ != "__mp_main__":
+  code = "(define (sq x) (* x x)) (sq 3)"
+
+  # Every task runs in fresh globals, even on the same worker.
+  with ProcessPool(max_workers=1) as pool:
+    assert pool.evaluate_list(code, parse(code)) == [None, 9.0]
+    assert_exception(lambda : pool.evaluate_list("(sq 3)", parse("(sq 3)")), EvalException)
+    assert pool.evaluate_list("(define x 42)", parse("(define x 42)")) == [None]
+    assert_exception(lambda : pool.evaluate_list("x", parse("x")), EvalException)
+    assert pool.evaluate_list("(define (+ a b) 0) (+ 1 2)", parse("(define (+ a b) 0) (+ 1 2)")) == [None, 0]
+    assert pool.evaluate_list("(+ 1 2)", parse("(+ 1 2)")) == [3]
+
+  with ProcessPool(max_workers=2, cpu_limit=1, memory_limit=2**30) as pool:
+    assert pool.evaluate_list(code, parse(code)) == [None, 9.0]
+
+    # Several evaluations run at once.
+    futures = [pool.submit(code, parse(code)) for _ in range(8)]
+    assert [f.result() for f in futures] == [[None, 9.0]] * 8
+
+    # A runaway evaluation is killed at its timeout, and its worker replaced.
+    loop = "(define (loop n) (loop (+ n 1))) (loop 0)"
+    begin = time.time()
+    assert_exception(lambda : pool.evaluate_list(loop, parse(loop), timeout=0.5), EvalException)
+    assert time.time() - begin < 2
+    assert pool.evaluate_list(code, parse(code)) == [None, 9.0]
+
+    # The CPU limit stops it even without a timeout.
+    assert_exception(lambda : pool.evaluate_list(loop, parse(loop), timeout=30), EvalException)
+
+    # So does the memory limit.
+    grow = "(define (grow s n) (if (= n 0) s (grow (strcat s s) (- n 1)))) (grow \"x\" 40)"
+    assert_exception(lambda : pool.evaluate_list(grow, parse(grow), timeout=30), EvalException)
+    assert pool.evaluate_list(code, parse(code)) == [None, 9.0]
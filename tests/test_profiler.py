@@ -0,0 +1,39 @@
+from plisp.ast import parse
+from plisp.evaluate import evaluate_list, Session
+from plisp.profiler import Profiler
+from io import StringIO
+import pstats
+
+code = """
+(define (fact n acc) (if (< n 1) acc (fact (- n 1) (* n acc))))
+(define (fib n) (if (< n 2) n (+ (fib (- n 1)) (fib (- n 2)))))
+(fact 10 1)
+(fib 10)
+"""
+
+
+def records(profiler):
+  return {record.name: record for record in profiler.records.values()}
+
+
+for stackless in (False, True):
+  profiler = Profiler()
+  assert evaluate_list(code, parse(StringIO(code)), profiler=profiler, stackless=stackless) == [None, None, 3628800, 55]
+  by_name = records(profiler)
+  # Tail calls are counted at their call sites, and as iterations of the trampoline.
+  assert (by_name["fact"].calls, by_name["fact"].tail_calls) == (11, 10)
+  assert (by_name["fib"].calls, by_name["fib"].primitive_calls, by_name["fib"].tail_calls) == (177, 1, 0)
+  # Builtins are counted even where they are compiled into fast paths.
+  assert by_name["-"].calls == 10 + 176
+  assert by_name["fib"].inclusive >= by_name["fib"].exclusive > 0
+
+print(profiler.report(limit=3))
+stats = pstats.Stats(profiler)
+assert stats.stats[("<plisp>", 3, "fib")][:2] == (1, 177)
+
+# The context is left as it was, with the builtins shadowed meanwhile.
+session = Session()
+session.evaluate("(define (- a b) (+ a b))", profiler=Profiler())
+assert type(session.context.stack_trace) is list
+assert type(session.context.shadowed_builtins) is set and "-" in session.context.shadowed_builtins
+assert session.evaluate("(- 1 2) (* 2 3)") == [3, 6]
@@ -10,7 +10,7 @@ import sys
 
 def test_evaluate(code : str, expected=None):
   node = parse(StringIO(code))
-  r = map(str, evaluate_list(node))
+  r = map(str, evaluate_list(code, node))
   result = filter(lambda x : x != "None", r)
   result = '\n'.join(list(result))
 
@@ -0,0 +1,69 @@
+from plisp.evaluate import Session, Context, AtomicSignal, EvalException, WorkerPool, default_pool
+from plisp import ast
+import io
+from tests.utils import assert_exception
+import threading
+import time
+
+session = Session(timeout=5)
+assert session.evaluate("(define (sq x) (* x x))") == [None]
+assert session.evaluate("(define y (sq 3)) y") == [None, 9.0]
+assert session.evaluate("(sq y)") == [81.0]
+assert_exception(lambda : session.evaluate("(sq undefined-name)"), EvalException)
+assert session.evaluate("(sq 2)") == [4.0]
+
+# A runaway evaluation is killed, and the session stays usable afterwards.
+begin = time.time()
+assert_exception(lambda : session.evaluate("(define (loop n) (loop (+ n 1))) (loop 0)", timeout=0.5), EvalException)
+assert time.time() - begin < 2
+assert session.evaluate("(sq 5)") == [25.0]
+
+# Worker threads are reused between calls.
+threads = len(default_pool()._threads)
+for i in range(20):
+  assert Session().evaluate("(+ %d 1)" % i) == [i + 1.0]
+assert len(default_pool()._threads) <= max(threads, 1)
+
+session.reset()
+assert_exception(lambda : session.evaluate("(sq 2)"), EvalException)
+
+# A job submitted right after a slow one does not queue behind it.
+pool = WorkerPool(max_workers=4)
+release = threading.Event()
+slow = pool.submit(release.wait)
+assert pool.submit(lambda : 1).result(1) == 1
+release.set()
+assert slow.result(1)
+
+# Nor do jobs submitted at once from many threads.
+results = []
+submitters = [threading.Thread(target=lambda : results.append(pool.submit(time.sleep, 0.2).result(1))) for _ in range(8)]
+for submitter in submitters:
+  submitter.start()
+for submitter in submitters:
+  submitter.join()
+assert results == [None] * 8 and len(pool._threads) <= 4
+
+# Threads stuck in abandoned jobs are replaced.
+stuck = threading.Event()
+futures = [pool.submit(stuck.wait) for _ in range(4)]
+while len(pool._running) < 4:
+  time.sleep(0.01)
+for future in futures:
+  pool.abandon(future)
+assert pool.submit(lambda : 3).result(1) == 3
+stuck.set()
+assert all(future.result(1) for future in futures)
+while len(pool._running) > 0:
+  time.sleep(0.01)
+assert len(pool._threads) <= 4
+
+# The kill signal is polled at function calls, without a lock.
+signal = AtomicSignal()
+context = Context("", signal, append_namespace=True)
+context.evaluate_list(ast.parse(io.StringIO("(define (f x) (+ x 1))")))
+signal.value = "kill"
+assert signal.killed
+assert_exception(lambda : context.evaluate(ast.parse(io.StringIO("(f 1)"))[0]), EvalException)
+signal.value = ""
+assert context.evaluate(ast.parse(io.StringIO("(f 1)"))[0]) == 2.0
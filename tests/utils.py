@@ -21,9 +21,10 @@ def print_asserted_expection(code):
 
   raise Exception("Should throw exception %s" % EvalException)
 
-def test_evaluate(code : str, expected=None):
-  node = parse(StringIO(code))
-  result = '|'.join(map(str, evaluate_list(code, node, append_namespace=True)))
+def test_evaluate(code : str, expected=None, stackless=False, optimize=False, exact=False):
+  # The expectations were written when every number was a float.
+  node = parse(StringIO(code), exact)
+  result = '|'.join(map(str, evaluate_list(code, node, append_namespace=True, stackless=stackless, optimize=optimize)))
   if expected and result != expected:
     raise ValueError("Got [\n%s\n] when [\n%s\n] is expected. \nCode: \n=================\n%s\n=================\n" % (result, expected, code))
   return result
\ No newline at end of file